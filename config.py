@@ -17,6 +17,13 @@ MAX_ALLOWED_DESIRED_TICK_CHANGE = 45
 MINT_DESIRED_TICK = 632
 
 
+# ##########################################
+# Parameters used for closing the position
+# ##########################################
+# max pool tick move tolerated by closeLiquidityPositionWithMinAmounts() bounds
+CLOSE_TICK_TOLERANCE = 10
+
+
 # #####################################
 # Parameters used for TESTING
 # #####################################
@@ -32,3 +39,17 @@ WETH_TOKEN = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
 WSTETH_TOKEN = "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0"
 LIDO_AGENT = "0x3e40D73EB977Dc6a537aF587D48316feE66E9C8c"
 NONFUNGIBLE_POSITION_MANAGER = "0xC36442b4a4522E871399CD717aBDD847Ab11FE88"
+UNISWAP_V3_FACTORY = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
+
+
+# ##############################################################
+# Pools for scouting/monitoring, resolved via UNISWAP_V3_FACTORY
+# ##############################################################
+# name: (token0, token1, fee, position lower tick, position upper tick)
+# the position range is aligned to the pool tick spacing on discovery
+POOLS = {
+    'wsteth-weth-0.01%': (WSTETH_TOKEN, WETH_TOKEN, 100, -1630, 970),
+    'wsteth-weth-0.05%': (WSTETH_TOKEN, WETH_TOKEN, 500, -1630, 970),
+    'wsteth-weth-0.3%': (WSTETH_TOKEN, WETH_TOKEN, 3000, -1630, 970),
+    'wsteth-weth-1%': (WSTETH_TOKEN, WETH_TOKEN, 10000, -1630, 970),
+}
@@ -242,9 +242,8 @@ contract UniV3LiquidityProvider {
         (tokenId, liquidity, amount0, amount1) = NONFUNGIBLE_POSITION_MANAGER.mint(params);
         liquidityProvided = liquidity;
         liquidityPositionTokenId = tokenId;
-        
-        IERC20(TOKEN0).approve(address(NONFUNGIBLE_POSITION_MANAGER), 0);
-        IERC20(TOKEN1).approve(address(NONFUNGIBLE_POSITION_MANAGER), 0);
+
+        _resetPositionManagerAllowances(amount0, amount1);
 
         emit LiquidityProvided(tokenId, liquidity, amount0, amount1);
 
@@ -263,17 +262,41 @@ contract UniV3LiquidityProvider {
         uint256 amount0Fees,
         uint256 amount1Fees
     ) {
-        // TODO: maybe adjust amount{0,1}Min for slippage protection
-        //       is sandwitch scary? is anything else is scarry?
+        return _closeLiquidityPosition(0, 0);
+    }
+
+    /**
+     * Same as closeLiquidityPosition() but reverts if the price moves so much
+     * that the withdrawn liquidity (excluding fees) is less than the given amounts
+     *
+     * @param _amount0Min min amount of wstETH to withdraw
+     * @param _amount1Min min amount of WETH to withdraw
+     */
+    function closeLiquidityPositionWithMinAmounts(uint256 _amount0Min, uint256 _amount1Min)
+        external authAdminOrDao() returns (
+            uint256 amount0,
+            uint256 amount1,
+            uint256 amount0Fees,
+            uint256 amount1Fees
+        )
+    {
+        return _closeLiquidityPosition(_amount0Min, _amount1Min);
+    }
 
+    function _closeLiquidityPosition(uint256 _amount0Min, uint256 _amount1Min) internal returns (
+        uint256 amount0,
+        uint256 amount1,
+        uint256 amount0Fees,
+        uint256 amount1Fees
+    ) {
         // amount0Min and amount1Min are price slippage checks
         // if the amount received after burning is not greater than these minimums, transaction will fail
         INonfungiblePositionManager.DecreaseLiquidityParams memory params =
             INonfungiblePositionManager.DecreaseLiquidityParams({
                 tokenId: liquidityPositionTokenId,
                 liquidity: liquidityProvided,
-                amount0Min: 0,
-                amount1Min: 0,
+                amount0Min: _amount0Min,
+                amount1Min: _amount1Min,
                 deadline: block.timestamp
             });
 
@@ -415,18 +438,48 @@ contract UniV3LiquidityProvider {
         require(IERC20(TOKEN1).balanceOf(address(this)) >= _amount1, "NOT_ENOUGH_WETH");
     }
 
-    function _refundLeftoversToLidoAgent() internal {
-        uint256 token0Balance = IERC20(TOKEN0).balanceOf(address(this));
+    /// transferFrom decreases the allowance, so only a partially used one needs to be reset
+    function _resetPositionManagerAllowances(uint256 _amount0Used, uint256 _amount1Used) internal virtual {
+        if (_amount0Used < desiredWstethAmount) {
+            IERC20(TOKEN0).approve(address(NONFUNGIBLE_POSITION_MANAGER), 0);
+        }
+        if (_amount1Used < desiredWethAmount) {
+            IERC20(TOKEN1).approve(address(NONFUNGIBLE_POSITION_MANAGER), 0);
+        }
+    }
+
+    /// Skips the calls which would do nothing for zero balances, so no zero amount
+    /// ERC20Refunded event is emitted. ETH is always left (at least ETH_AMOUNT_MARGIN
+    /// after a mint), so it is refunded unconditionally
+    function _refundLeftoversToLidoAgent() internal virtual {
+        uint256 token0Balance = _selfBalanceOf(TOKEN0);
         if (token0Balance > 0) {
             IWstETH(TOKEN0).unwrap(token0Balance);
         }
 
-        _refundERC20(STETH_TOKEN, IERC20(STETH_TOKEN).balanceOf(address(this)));
+        uint256 stethBalance = _selfBalanceOf(STETH_TOKEN);
+        if (stethBalance > 0) {
+            _refundERC20(STETH_TOKEN, stethBalance);
+        }
+
+        uint256 token1Balance = _selfBalanceOf(TOKEN1);
+        if (token1Balance > 0) {
+            IWETH(TOKEN1).withdraw(token1Balance);
+        }
 
-        IWETH(TOKEN1).withdraw(IERC20(TOKEN1).balanceOf(address(this)));
         _refundETH();
     }
 
+    /// Low-level balanceOf call: skips the extcodesize check of an interface call,
+    /// the tokens are known contracts
+    function _selfBalanceOf(address _token) internal view returns (uint256) {
+        (bool success, bytes memory data) = _token.staticcall(
+            abi.encodeWithSelector(IERC20.balanceOf.selector, address(this))
+        );
+        require(success && data.length >= 32, "BALANCE_OF_FAILED");
+        return abi.decode(data, (uint256));
+    }
+
     function _deviationFromDesiredTick() internal view returns (uint24) {
         (, int24 currentTick, , , , , ) = POOL.slot0();
 
@@ -0,0 +1,124 @@
+//SPDX-License-Identifier: MIT
+pragma solidity ^0.7.0;
+pragma abicoder v2;
+
+import { IUniswapV3Pool } from "@uniswap/v3-core/contracts/interfaces/IUniswapV3Pool.sol";
+import '@uniswap/v3-periphery/contracts/interfaces/INonfungiblePositionManager.sol';
+
+import { UniV3LiquidityProvider } from "./UniV3LiquidityProvider.sol";
+
+
+/**
+ * Read-only helper returning the whole state of UniV3LiquidityProvider,
+ * its pool and its liquidity position in a single call (thus for a single block)
+ */
+contract UniV3LiquidityProviderLens {
+
+    struct ProviderState {
+        uint256 blockNumber;
+        uint256 blockTimestamp;
+
+        // UniV3LiquidityProvider
+        address admin;
+        uint256 ethAmount;
+        uint256 ethBalance;
+        int24 desiredTick;
+        uint24 maxTickDeviation;
+        int24 minAllowedDesiredTick;
+        int24 maxAllowedDesiredTick;
+        int24 positionLowerTick;
+        int24 positionUpperTick;
+        uint256 desiredWstethAmount;
+        uint256 desiredWethAmount;
+        uint256 minWstethAmount;
+        uint256 minWethAmount;
+        uint128 liquidityProvided;
+        uint256 liquidityPositionTokenId;
+
+        // Pool
+        uint160 sqrtPriceX96;
+        int24 tick;
+        uint128 poolLiquidity;
+        uint256 feeGrowthGlobal0X128;
+        uint256 feeGrowthGlobal1X128;
+        uint256 lowerTickFeeGrowthOutside0X128;
+        uint256 lowerTickFeeGrowthOutside1X128;
+        uint256 upperTickFeeGrowthOutside0X128;
+        uint256 upperTickFeeGrowthOutside1X128;
+
+        // Liquidity position NFT (all zeros if there is no position)
+        uint128 positionLiquidity;
+        uint256 positionFeeGrowthInside0LastX128;
+        uint256 positionFeeGrowthInside1LastX128;
+        uint128 positionTokensOwed0;
+        uint128 positionTokensOwed1;
+    }
+
+    function getState(UniV3LiquidityProvider _provider) public view returns (ProviderState memory state) {
+        state.blockNumber = block.number;
+        state.blockTimestamp = block.timestamp;
+
+        _readProvider(state, _provider);
+        _readPool(state, _provider.POOL());
+
+        if (state.liquidityPositionTokenId != 0) {
+            _readPosition(state, _provider.NONFUNGIBLE_POSITION_MANAGER());
+        }
+    }
+
+    function _readProvider(ProviderState memory _state, UniV3LiquidityProvider _provider) internal view {
+        _state.admin = _provider.admin();
+        _state.ethAmount = _provider.ethAmount();
+        _state.ethBalance = address(_provider).balance;
+        _state.desiredTick = _provider.desiredTick();
+        _state.maxTickDeviation = _provider.MAX_TICK_DEVIATION();
+        _state.minAllowedDesiredTick = _provider.MIN_ALLOWED_DESIRED_TICK();
+        _state.maxAllowedDesiredTick = _provider.MAX_ALLOWED_DESIRED_TICK();
+        _state.positionLowerTick = _provider.POSITION_LOWER_TICK();
+        _state.positionUpperTick = _provider.POSITION_UPPER_TICK();
+        _state.desiredWstethAmount = _provider.desiredWstethAmount();
+        _state.desiredWethAmount = _provider.desiredWethAmount();
+        _state.minWstethAmount = _provider.minWstethAmount();
+        _state.minWethAmount = _provider.minWethAmount();
+        _state.liquidityProvided = _provider.liquidityProvided();
+        _state.liquidityPositionTokenId = _provider.liquidityPositionTokenId();
+    }
+
+    function _readPool(ProviderState memory _state, IUniswapV3Pool _pool) internal view {
+        (_state.sqrtPriceX96, _state.tick, , , , , ) = _pool.slot0();
+        _state.poolLiquidity = _pool.liquidity();
+        _state.feeGrowthGlobal0X128 = _pool.feeGrowthGlobal0X128();
+        _state.feeGrowthGlobal1X128 = _pool.feeGrowthGlobal1X128();
+
+        (, , _state.lowerTickFeeGrowthOutside0X128, _state.lowerTickFeeGrowthOutside1X128, , , , ) =
+            _pool.ticks(_state.positionLowerTick);
+        (, , _state.upperTickFeeGrowthOutside0X128, _state.upperTickFeeGrowthOutside1X128, , , , ) =
+            _pool.ticks(_state.positionUpperTick);
+    }
+
+    function _readPosition(ProviderState memory _state, INonfungiblePositionManager _positionManager) internal view {
+        (
+            , , , , , , ,
+            _state.positionLiquidity,
+            _state.positionFeeGrowthInside0LastX128,
+            _state.positionFeeGrowthInside1LastX128,
+            _state.positionTokensOwed0,
+            _state.positionTokensOwed1
+        ) = _positionManager.positions(_state.liquidityPositionTokenId);
+    }
+}
+
+
+/**
+ * Never deployed: eth_call of the creation code with the provider address
+ * returns the same data as UniV3LiquidityProviderLens.getState(), so the
+ * state can be read on networks without a deployed lens
+ */
+contract UniV3LiquidityProviderLensDeployless is UniV3LiquidityProviderLens {
+    constructor(UniV3LiquidityProvider _provider) {
+        bytes memory state = abi.encode(getState(_provider));
+        assembly {
+            return(add(state, 32), mload(state))
+        }
+    }
+}
@@ -168,6 +168,53 @@ contract TestUniV3LiquidityProvider is
         ); 
     }
 
+    /// Batch variants of the view helpers above, to cross-check many points per eth_call
+
+    function calcDesiredTokensRatioBatch(int24[] calldata _ticks) external view returns (uint256[] memory ratios) {
+        ratios = new uint256[](_ticks.length);
+        for (uint256 i = 0; i < _ticks.length; ++i) {
+            ratios[i] = _calcDesiredTokensRatio(_ticks[i]);
+        }
+    }
+
+    function calcDesiredTokenAmountsBatch(int24[] calldata _ticks, uint256[] calldata _ethAmounts)
+        external view returns (uint256[] memory amounts0, uint256[] memory amounts1)
+    {
+        require(_ticks.length == _ethAmounts.length, "LENGTH_MISMATCH");
+        amounts0 = new uint256[](_ticks.length);
+        amounts1 = new uint256[](_ticks.length);
+        for (uint256 i = 0; i < _ticks.length; ++i) {
+            (amounts0[i], amounts1[i]) = _calcDesiredTokenAmounts(_ticks[i], _ethAmounts[i]);
+        }
+    }
+
+    function getSqrtRatioAtTickBatch(int24[] calldata _ticks) external pure returns (uint160[] memory sqrtRatios) {
+        sqrtRatios = new uint160[](_ticks.length);
+        for (uint256 i = 0; i < _ticks.length; ++i) {
+            sqrtRatios[i] = TickMath.getSqrtRatioAtTick(_ticks[i]);
+        }
+    }
+
+    function getLiquidityForAmountsBatch(uint256[] calldata _amounts0, uint256[] calldata _amounts1)
+        external view returns (uint128[] memory liquidities)
+    {
+        require(_amounts0.length == _amounts1.length, "LENGTH_MISMATCH");
+        (uint160 sqrtPriceX96, , , , , , ) = POOL.slot0();
+        uint160 sqrtRatioAX96 = TickMath.getSqrtRatioAtTick(POSITION_LOWER_TICK);
+        uint160 sqrtRatioBX96 = TickMath.getSqrtRatioAtTick(POSITION_UPPER_TICK);
+
+        liquidities = new uint128[](_amounts0.length);
+        for (uint256 i = 0; i < _amounts0.length; ++i) {
+            liquidities[i] = LiquidityAmounts.getLiquidityForAmounts(
+                sqrtPriceX96,
+                sqrtRatioAX96,
+                sqrtRatioBX96,
+                _amounts0[i],
+                _amounts1[i]
+            );
+        }
+    }
+
     function uniswapV3MintCallback(
         uint256 _amount0Owed,
         uint256 _amount1Owed,
@@ -242,3 +289,37 @@ contract TestUniV3LiquidityProvider is
         return uint(sqrtRatioX96).mul(uint(sqrtRatioX96)).mul(1e18) >> (96 * 2);
     }
 }
+
+
+/// The allowance reset and leftovers refund before zero-value calls were skipped, kept for gas comparison
+contract TestUniV3LiquidityProviderBaseline is TestUniV3LiquidityProvider {
+    constructor(
+        uint256 _ethAmount,
+        int24 _desiredTick,
+        uint24 _maxTickDeviation,
+        uint24 _maxAllowedDesiredTickChange
+    ) TestUniV3LiquidityProvider(
+        _ethAmount,
+        _desiredTick,
+        _maxTickDeviation,
+        _maxAllowedDesiredTickChange
+    ) {
+    }
+
+    function _resetPositionManagerAllowances(uint256, uint256) internal override {
+        IERC20(TOKEN0).approve(address(NONFUNGIBLE_POSITION_MANAGER), 0);
+        IERC20(TOKEN1).approve(address(NONFUNGIBLE_POSITION_MANAGER), 0);
+    }
+
+    function _refundLeftoversToLidoAgent() internal override {
+        uint256 token0Balance = IERC20(TOKEN0).balanceOf(address(this));
+        if (token0Balance > 0) {
+            IWstETH(TOKEN0).unwrap(token0Balance);
+        }
+
+        _refundERC20(STETH_TOKEN, IERC20(STETH_TOKEN).balanceOf(address(this)));
+
+        IWETH(TOKEN1).withdraw(IERC20(TOKEN1).balanceOf(address(this)));
+        _refundETH();
+    }
+}
@@ -0,0 +1,66 @@
+"""Compares fast_call against brownie calls of the same view methods
+
+Run with `brownie run bench_fast_call`. The overhead columns exclude the node:
+they time encoding the call and decoding a result fetched beforehand.
+"""
+from brownie import accounts, interface, TestUniV3LiquidityProvider
+import timeit
+
+import sys
+import os.path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from config import *
+from . import fast_call
+
+
+ITERATIONS = 200
+OVERHEAD_ITERATIONS = 20000
+
+
+def bench(fn, iterations):
+    seconds = min(timeit.repeat(fn, number=iterations, repeat=3))
+    return seconds / iterations * 1e6
+
+
+def main():
+    pool = interface.IUniswapV3Pool(POOL)
+    wsteth_token = interface.WSTETH(WSTETH_TOKEN)
+    weth_token = interface.WETH(WETH_TOKEN)
+    provider = TestUniV3LiquidityProvider.deploy(
+        ETH_TO_SEED,
+        INITIAL_DESIRED_TICK,
+        MAX_TICK_DEVIATION,
+        MAX_ALLOWED_DESIRED_TICK_CHANGE,
+        {'from': accounts[0]})
+    tick_spacing = pool.tickSpacing()
+    tick = pool.slot0()[1] // tick_spacing * tick_spacing
+
+    # name, brownie method and args, fast call, fast call encoder and decoder
+    methods = [
+        ('slot0', pool.slot0, (), lambda: fast_call.slot0(pool),
+            lambda: fast_call.SLOT0_SELECTOR, fast_call.decode_slot0),
+        ('ticks', pool.ticks, (tick,), lambda: fast_call.ticks(pool, tick),
+            lambda: fast_call.encode_ticks(tick), fast_call.decode_tick_info),
+        ('balanceOf', weth_token.balanceOf, (POOL,), lambda: fast_call.balance_of(weth_token, POOL),
+            lambda: fast_call.encode_balance_of(POOL), fast_call.decode_uint),
+        ('stEthPerToken', wsteth_token.stEthPerToken, (), lambda: fast_call.st_eth_per_token(wsteth_token),
+            lambda: fast_call.ST_ETH_PER_TOKEN_SELECTOR, fast_call.decode_uint),
+        ('desiredTick', provider.desiredTick, (), lambda: fast_call.desired_tick(provider),
+            lambda: fast_call.DESIRED_TICK_SELECTOR, fast_call.decode_int),
+        ('getSpotPrice', provider.getSpotPrice, (), lambda: fast_call.get_spot_price(provider),
+            lambda: fast_call.GET_SPOT_PRICE_SELECTOR, fast_call.decode_uint),
+    ]
+
+    print(f'{"method":>14} | {"brownie call":>12} | {"fast call":>9} | {"brownie overhead":>16} | {"fast overhead":>13} (us)')
+    for name, method, args, fast, encode, decode in methods:
+        assert method.encode_input(*args) == encode()
+        assert method(*args) == fast()
+        raw = fast_call.eth_call(method._address, encode())
+
+        brownie_overhead = bench(lambda: method.decode_output(method.encode_input(*args) and raw), OVERHEAD_ITERATIONS)
+        fast_overhead = bench(lambda: decode(encode() and raw), OVERHEAD_ITERATIONS)
+        print(
+            f'{name:>14} | {bench(lambda: method(*args), ITERATIONS):12.1f} | {bench(fast, ITERATIONS):9.1f} | '
+            f'{brownie_overhead:16.1f} | {fast_overhead:13.1f}'
+        )
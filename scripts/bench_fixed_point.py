@@ -0,0 +1,71 @@
+"""Compares E18 against float and Decimal on typical amount calculations
+
+Run with `python -m scripts.bench_fixed_point` (or `brownie run bench_fixed_point`).
+"""
+from decimal import Decimal, localcontext
+import timeit
+
+from .fixed_point import E18
+
+
+ITERATIONS = 200000
+
+# 600 ETH split like in scout.calc_token_amounts
+ETH_WEI = 600 * 10**18 - 500
+RATIO_WEI = 168449221999299740
+STETH_PER_TOKEN_WEI = 1081264356245232910
+
+
+def split_float():
+    ratio = RATIO_WEI / 1e18
+    weth = ETH_WEI / (1 + ratio * STETH_PER_TOKEN_WEI / 1e18)
+    return round(weth * ratio), round(weth)
+
+
+def split_decimal():
+    with localcontext() as ctx:
+        ctx.prec = 80
+        ratio = Decimal(RATIO_WEI).scaleb(-18)
+        weth = Decimal(ETH_WEI).scaleb(-18) / (1 + ratio * Decimal(STETH_PER_TOKEN_WEI).scaleb(-18))
+        return int((weth * ratio).scaleb(18)), int(weth.scaleb(18))
+
+
+def split_e18():
+    ratio = E18.from_wei(RATIO_WEI)
+    weth = E18.from_wei(ETH_WEI) / (E18(1) + ratio * E18.from_wei(STETH_PER_TOKEN_WEI))
+    return (weth * ratio).wei, weth.wei
+
+
+def format_float():
+    return f'{ETH_WEI / 1e18:.4f}'
+
+
+def format_decimal():
+    return f'{Decimal(ETH_WEI).scaleb(-18):.4f}'
+
+
+def format_e18():
+    return f'{E18.from_wei(ETH_WEI):.4f}'
+
+
+def bench(fn, iterations=ITERATIONS):
+    seconds = min(timeit.repeat(fn, number=iterations, repeat=3))
+    return seconds / iterations * 1e9
+
+
+def main():
+    exact = split_e18()
+    for name, split, fmt in [
+        ('float', split_float, format_float),
+        ('Decimal', split_decimal, format_decimal),
+        ('E18', split_e18, format_e18),
+    ]:
+        wsteth, weth = split()
+        print(
+            f'{name:>8}: split {bench(split):8.0f} ns, format {bench(fmt):6.0f} ns, '
+            f'wei error vs exact: {wsteth - exact[0]}, {weth - exact[1]}'
+        )
+
+
+if __name__ == '__main__':
+    main()
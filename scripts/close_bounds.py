@@ -0,0 +1,138 @@
+"""Slippage bounds for closeLiquidityPositionWithMinAmounts()
+
+The min amounts are the burn amounts of the position at the worst prices
+within `tick_tolerance` ticks of the current one: the price of the tick
+`tick_tolerance` above for wstETH (amount0 decreases with the price) and the
+one `tick_tolerance` below for WETH. The cost of moving the price out of the
+tolerance band is computed by walking the initialized ticks of the pool, with
+the same per-step rounding and fees as UniswapV3Pool.swap(), so it is exact
+for exact input swaps.
+"""
+from brownie import interface, UniV3LiquidityProvider
+from collections import namedtuple
+
+import sys
+import os.path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from config import *
+from . import fast_call
+from .lens import read_provider_state
+from .pools import get_initialized_ticks
+from .utils import formatE18, read_deploy_address
+from .univ3_math import (
+    get_amount0_delta,
+    get_amount1_delta,
+    get_amounts_for_burn,
+    get_sqrt_ratio_at_tick,
+    mul_div_rounding_up,
+)
+
+
+FEE_DENOMINATOR = 10**6
+
+LiquidityProfile = namedtuple('LiquidityProfile', ['sqrt_price_x96', 'tick', 'liquidity', 'fee', 'liquidity_nets'])
+
+CloseQuote = namedtuple('CloseQuote', [
+    'amount0',
+    'amount1',
+    'amount0_min',
+    'amount1_min',
+    'amount0_in_to_min_price',  # wstETH to swap in to push the price to the lower band edge
+    'amount1_in_to_max_price',  # WETH to swap in to push the price to the upper band edge
+])
+
+
+def get_band_sqrt_prices(tick, tick_tolerance):
+    """Sqrt prices of the ticks `tick_tolerance` below and above `tick`, a move by one more tick is out of the band"""
+    return get_sqrt_ratio_at_tick(tick - tick_tolerance), get_sqrt_ratio_at_tick(tick + tick_tolerance)
+
+
+def read_liquidity_profile(pool, state, tick_tolerance, block_identifier='latest'):
+    """liquidityNet of the initialized ticks within the tolerance band around the current tick"""
+    ticks = get_initialized_ticks(
+        pool, state.tick - tick_tolerance, state.tick + tick_tolerance, block_identifier=block_identifier)
+    liquidity_nets = {tick: fast_call.ticks(pool, tick, block_identifier)[1] for tick in ticks}
+    fee = pool.fee(block_identifier=block_identifier)
+    return LiquidityProfile(state.sqrt_price_x96, state.tick, state.pool_liquidity, fee, liquidity_nets)
+
+
+def _with_fee(amount_in, fee):
+    return amount_in + mul_div_rounding_up(amount_in, fee, FEE_DENOMINATOR - fee)
+
+
+def get_amount_in_to_sqrt_price(profile, target_sqrt_price_x96):
+    """Exact input (fees included) of an exact input swap that moves the pool price to the target"""
+    sqrt_price_x96, liquidity = profile.sqrt_price_x96, profile.liquidity
+    amount_in = 0
+
+    if target_sqrt_price_x96 < sqrt_price_x96:
+        # zero for one: ticks are crossed downwards at their lower boundary, liquidityNet is subtracted
+        for tick in sorted((t for t in profile.liquidity_nets if t <= profile.tick), reverse=True):
+            boundary = get_sqrt_ratio_at_tick(tick)
+            if boundary <= target_sqrt_price_x96:
+                break
+            amount_in += _with_fee(get_amount0_delta(boundary, sqrt_price_x96, liquidity, True), profile.fee)
+            sqrt_price_x96, liquidity = boundary, liquidity - profile.liquidity_nets[tick]
+        return amount_in + _with_fee(
+            get_amount0_delta(target_sqrt_price_x96, sqrt_price_x96, liquidity, True), profile.fee)
+
+    if target_sqrt_price_x96 > sqrt_price_x96:
+        for tick in sorted(t for t in profile.liquidity_nets if t > profile.tick):
+            boundary = get_sqrt_ratio_at_tick(tick)
+            if boundary >= target_sqrt_price_x96:
+                break
+            amount_in += _with_fee(get_amount1_delta(sqrt_price_x96, boundary, liquidity, True), profile.fee)
+            sqrt_price_x96, liquidity = boundary, liquidity + profile.liquidity_nets[tick]
+        return amount_in + _with_fee(
+            get_amount1_delta(sqrt_price_x96, target_sqrt_price_x96, liquidity, True), profile.fee)
+
+    return 0
+
+
+def quote_close_min_amounts(state, tick_tolerance):
+    """@return (amount0Min, amount1Min) for closing the position read by the lens"""
+    min_sqrt_price_x96, max_sqrt_price_x96 = get_band_sqrt_prices(state.tick, tick_tolerance)
+    amount0_min, _ = get_amounts_for_burn(
+        max_sqrt_price_x96, state.tick + tick_tolerance,
+        state.position_lower_tick, state.position_upper_tick, state.liquidity_provided)
+    _, amount1_min = get_amounts_for_burn(
+        min_sqrt_price_x96, state.tick - tick_tolerance,
+        state.position_lower_tick, state.position_upper_tick, state.liquidity_provided)
+    return amount0_min, amount1_min
+
+
+def quote_close(provider, pool, tick_tolerance=CLOSE_TICK_TOLERANCE, lens=None, block_identifier=None):
+    state = read_provider_state(provider, lens, block_identifier)
+    assert state.liquidity_position_token_id != 0, 'no liquidity position'
+
+    amount0, amount1 = get_amounts_for_burn(
+        state.sqrt_price_x96, state.tick,
+        state.position_lower_tick, state.position_upper_tick, state.liquidity_provided)
+    amount0_min, amount1_min = quote_close_min_amounts(state, tick_tolerance)
+
+    profile = read_liquidity_profile(pool, state, tick_tolerance, state.block_number)
+    min_sqrt_price_x96, max_sqrt_price_x96 = get_band_sqrt_prices(state.tick, tick_tolerance)
+    return CloseQuote(
+        amount0,
+        amount1,
+        amount0_min,
+        amount1_min,
+        get_amount_in_to_sqrt_price(profile, min_sqrt_price_x96),
+        get_amount_in_to_sqrt_price(profile, max_sqrt_price_x96),
+    )
+
+
+def main(tick_tolerance=CLOSE_TICK_TOLERANCE):
+    provider = UniV3LiquidityProvider.at(read_deploy_address())
+    quote = quote_close(provider, interface.IUniswapV3Pool(POOL), int(tick_tolerance))
+    print(
+        f'Closing the position of {provider} at the current price returns:\n'
+        f'  wsteth / weth = {formatE18(quote.amount0)} / {formatE18(quote.amount1)}\n'
+        f'Min amounts for a tick tolerance of {tick_tolerance}:\n'
+        f'  wsteth / weth = {formatE18(quote.amount0_min)} / {formatE18(quote.amount1_min)}\n'
+        f'Swap needed to move the price out of the band:\n'
+        f'  down: {formatE18(quote.amount0_in_to_min_price)} wsteth, up: {formatE18(quote.amount1_in_to_max_price)} weth\n'
+        f'Call closeLiquidityPositionWithMinAmounts({quote.amount0_min}, {quote.amount1_min})'
+    )
+    return quote
@@ -0,0 +1,98 @@
+from brownie import *
+from pprint import pprint
+
+import asyncio
+import sys
+import os.path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from config import *
+from .utils import *
+from .pipeline import TxPipeline, legacy_gas_price
+
+
+# The deploy gas limit is estimated, which also simulates the deployment.
+# Fund and mint gas limits are set explicitly, so that both are submitted
+# back to back without estimating against the state before the other one
+DEPLOY_GAS_MARGIN = 1.2
+FUND_GAS_LIMIT = 50000
+MINT_GAS_LIMIT = 1000000
+
+
+def get_deploy_init_code():
+    return UniV3LiquidityProvider.deploy.encode_input(
+        ETH_TO_SEED,
+        INITIAL_DESIRED_TICK,
+        MAX_TICK_DEVIATION,
+        MAX_ALLOWED_DESIRED_TICK_CHANGE,
+    )
+
+
+def estimate_deploy_gas(deployer, init_code):
+    """Simulates the deployment, raises if it would revert"""
+    try:
+        gas = web3.eth.estimate_gas({'from': str(deployer), 'data': init_code})
+    except Exception as error:
+        raise RuntimeError(f'deployment simulation failed: {error}') from error
+    return int(gas * DEPLOY_GAS_MARGIN)
+
+
+def build_flow(deployer, provider_address, desired_tick):
+    """Stages of the flow: fund and mint are only sent once the provider code is deployed"""
+    provider = Contract.from_abi('UniV3LiquidityProvider', provider_address, UniV3LiquidityProvider.abi)
+    init_code = get_deploy_init_code()
+    return [
+        (None, [
+            ('deploy', {
+                'data': init_code,
+                'gas': estimate_deploy_gas(deployer, init_code),
+            }),
+        ]),
+        (lambda: len(web3.eth.get_code(provider_address)) > 0, [
+            ('fund', {
+                'to': provider_address,
+                'value': ETH_TO_SEED,
+                'gas': FUND_GAS_LIMIT,
+            }),
+            ('mint', {
+                'to': provider_address,
+                'data': provider.mint.encode_input(desired_tick),
+                'gas': MINT_GAS_LIMIT,
+            }),
+        ]),
+    ]
+
+
+def main(deployer=None, skip_confirmation=False, gas_strategy=None):
+    if deployer is None:
+        deployer = accounts[0]  # for dev environment
+
+    print(f'DEPLOYER is {deployer}')
+
+    pipeline = TxPipeline(deployer, gas_strategy or legacy_gas_price())
+    provider_address = pipeline.next_contract_address()
+
+    print(
+        f'Going to deploy, then fund and mint with the following parameters:\n'
+        f'  ETH_TO_SEED: {formatE18(ETH_TO_SEED)}\n'
+        f'  INITIAL_DESIRED_TICK: {INITIAL_DESIRED_TICK}\n'
+        f'  MAX_TICK_DEVIATION: {MAX_TICK_DEVIATION}\n'
+        f'  MAX_ALLOWED_DESIRED_TICK_CHANGE: {MAX_ALLOWED_DESIRED_TICK_CHANGE}\n'
+        f'  MINT_DESIRED_TICK: {MINT_DESIRED_TICK}\n'
+        f'  provider address (precomputed): {provider_address}\n'
+    )
+
+    if not skip_confirmation:
+        reply = input('Are they correct? (yes/no)\n')
+        if reply != 'yes':
+            print("Operator hasn't approved correctness of the parameters. Deployment stopped.")
+            sys.exit(1)
+
+    steps = asyncio.run(pipeline.run_stages(build_flow(deployer, provider_address, MINT_DESIRED_TICK)))
+    print(pipeline.report())
+
+    deployed_address = steps[0].receipt['contractAddress']
+    assert deployed_address == provider_address, f'unexpected provider address {deployed_address}'
+    write_deploy_address(provider_address)
+
+    return UniV3LiquidityProvider.at(provider_address), steps
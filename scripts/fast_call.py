@@ -0,0 +1,124 @@
+"""eth_call of the hot view methods without brownie ContractCall overhead
+
+Selectors are computed once at import, arguments are encoded and results
+decoded with fixed offsets, and the request goes straight to the web3
+provider, bypassing the middlewares. The return values are the same as of the
+brownie calls. `block` is a block number or a tag like 'latest'.
+"""
+from brownie import web3
+from eth_utils import function_signature_to_4byte_selector
+
+
+def _selector(signature):
+    return '0x' + function_signature_to_4byte_selector(signature).hex()
+
+
+SLOT0_SELECTOR = _selector('slot0()')
+TICKS_SELECTOR = _selector('ticks(int24)')
+LIQUIDITY_SELECTOR = _selector('liquidity()')
+FEE_GROWTH_GLOBAL0_X128_SELECTOR = _selector('feeGrowthGlobal0X128()')
+FEE_GROWTH_GLOBAL1_X128_SELECTOR = _selector('feeGrowthGlobal1X128()')
+BALANCE_OF_SELECTOR = _selector('balanceOf(address)')
+ST_ETH_PER_TOKEN_SELECTOR = _selector('stEthPerToken()')
+DESIRED_TICK_SELECTOR = _selector('desiredTick()')
+GET_SPOT_PRICE_SELECTOR = _selector('getSpotPrice()')
+
+_UINT256_MOD = 1 << 256
+_INT256_MIN = 1 << 255
+
+
+def _encode_int(value):
+    return format(value % _UINT256_MOD, '064x')
+
+
+def _encode_address(address):
+    return str(address)[2:].lower().rjust(64, '0')
+
+
+def _words(result, count):
+    """Splits the hex `result` into `count` 256-bit unsigned words"""
+    return [int(result[2 + 64 * i: 66 + 64 * i], 16) for i in range(count)]
+
+
+def _signed(word):
+    return word - _UINT256_MOD if word >= _INT256_MIN else word
+
+
+def _block_param(block):
+    return hex(block) if isinstance(block, int) else block
+
+
+def eth_call(address, data, block='latest'):
+    response = web3.provider.make_request('eth_call', [{'to': str(address), 'data': data}, _block_param(block)])
+    if 'error' in response:
+        raise ValueError(response['error'])
+    return response['result']
+
+
+def decode_slot0(result):
+    sqrt_price_x96, tick, index, cardinality, cardinality_next, fee_protocol, unlocked = _words(result, 7)
+    return sqrt_price_x96, _signed(tick), index, cardinality, cardinality_next, fee_protocol, unlocked != 0
+
+
+def decode_tick_info(result):
+    (liquidity_gross, liquidity_net, fee_growth_outside0_x128, fee_growth_outside1_x128, tick_cumulative_outside,
+     seconds_per_liquidity_outside_x128, seconds_outside, initialized) = _words(result, 8)
+    return (
+        liquidity_gross, _signed(liquidity_net), fee_growth_outside0_x128, fee_growth_outside1_x128,
+        _signed(tick_cumulative_outside), seconds_per_liquidity_outside_x128, seconds_outside, initialized != 0
+    )
+
+
+def decode_uint(result):
+    return int(result, 16)
+
+
+def decode_int(result):
+    return _signed(int(result, 16))
+
+
+def encode_ticks(tick):
+    return TICKS_SELECTOR + _encode_int(tick)
+
+
+def encode_balance_of(owner):
+    return BALANCE_OF_SELECTOR + _encode_address(owner)
+
+
+def slot0(pool, block='latest'):
+    """@return (sqrtPriceX96, tick, observationIndex, observationCardinality, observationCardinalityNext, feeProtocol, unlocked)"""
+    return decode_slot0(eth_call(pool, SLOT0_SELECTOR, block))
+
+
+def ticks(pool, tick, block='latest'):
+    """@return (liquidityGross, liquidityNet, feeGrowthOutside0X128, feeGrowthOutside1X128, tickCumulativeOutside,
+                secondsPerLiquidityOutsideX128, secondsOutside, initialized)"""
+    return decode_tick_info(eth_call(pool, encode_ticks(tick), block))
+
+
+def liquidity(pool, block='latest'):
+    return decode_uint(eth_call(pool, LIQUIDITY_SELECTOR, block))
+
+
+def fee_growth_global0_x128(pool, block='latest'):
+    return decode_uint(eth_call(pool, FEE_GROWTH_GLOBAL0_X128_SELECTOR, block))
+
+
+def fee_growth_global1_x128(pool, block='latest'):
+    return decode_uint(eth_call(pool, FEE_GROWTH_GLOBAL1_X128_SELECTOR, block))
+
+
+def balance_of(token, owner, block='latest'):
+    return decode_uint(eth_call(token, encode_balance_of(owner), block))
+
+
+def st_eth_per_token(wsteth, block='latest'):
+    return decode_uint(eth_call(wsteth, ST_ETH_PER_TOKEN_SELECTOR, block))
+
+
+def desired_tick(provider, block='latest'):
+    return decode_int(eth_call(provider, DESIRED_TICK_SELECTOR, block))
+
+
+def get_spot_price(provider, block='latest'):
+    return decode_uint(eth_call(provider, GET_SPOT_PRICE_SELECTOR, block))
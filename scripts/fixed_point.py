@@ -0,0 +1,197 @@
+from decimal import Context, Decimal
+
+
+E18_DECIMALS = 18
+E18_SCALE = 10**E18_DECIMALS
+
+# enough digits for any uint256 amount, the default context keeps only 28
+_DECIMAL_CONTEXT = Context(prec=80)
+
+_new = object.__new__
+
+
+class E18:
+    """Exact fixed-point number with 18 decimals, stored as an integer amount of wei
+
+    E18(units) parses a human value ('1.5', Decimal('1.5'), 1.5 or 2), E18.from_wei()
+    wraps an on-chain integer. Plain ints are only accepted as multipliers/divisors
+    (and zero), because it is ambiguous whether they mean units or wei.
+    Ordering comparisons follow the same int rule, equality never raises: a nonzero
+    int is just not equal (E18(1) != 1). Floats and Decimals are compared by their
+    exact values, like Decimal does (E18(0.1) != 0.1), so equal values hash equally.
+    """
+    __slots__ = ('wei',)
+
+    def __init__(self, units=0):
+        if isinstance(units, E18):
+            self.wei = units.wei
+        elif isinstance(units, int):
+            self.wei = units * E18_SCALE
+        else:
+            if isinstance(units, float):
+                units = repr(units)  # the shortest decimal representation of the float
+            self.wei = int(Decimal(units).scaleb(E18_DECIMALS, _DECIMAL_CONTEXT).to_integral_value(context=_DECIMAL_CONTEXT))
+
+    @classmethod
+    def from_wei(cls, wei):
+        value = _new(cls)
+        value.wei = wei
+        return value
+
+    @staticmethod
+    def _wei_of(other):
+        if isinstance(other, E18):
+            return other.wei
+        if isinstance(other, int):
+            if other == 0:
+                return 0
+            raise TypeError('ambiguous int operand, use E18(units) or E18.from_wei(wei)')
+        if isinstance(other, (float, Decimal, str)):
+            return E18(other).wei
+        return None
+
+    # Each operator checks the E18 operand first, it is the hot path
+
+    def __add__(self, other):
+        result = _new(E18)
+        if other.__class__ is E18:
+            result.wei = self.wei + other.wei
+            return result
+        wei = self._wei_of(other)
+        if wei is None:
+            return NotImplemented
+        result.wei = self.wei + wei
+        return result
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        result = _new(E18)
+        if other.__class__ is E18:
+            result.wei = self.wei - other.wei
+            return result
+        wei = self._wei_of(other)
+        if wei is None:
+            return NotImplemented
+        result.wei = self.wei - wei
+        return result
+
+    def __rsub__(self, other):
+        wei = self._wei_of(other)
+        if wei is None:
+            return NotImplemented
+        return E18.from_wei(wei - self.wei)
+
+    def __mul__(self, other):
+        result = _new(E18)
+        if other.__class__ is E18:
+            result.wei = self.wei * other.wei // E18_SCALE
+            return result
+        if isinstance(other, int):
+            result.wei = self.wei * other
+            return result
+        wei = self._wei_of(other)
+        if wei is None:
+            return NotImplemented
+        result.wei = self.wei * wei // E18_SCALE
+        return result
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        result = _new(E18)
+        if other.__class__ is E18:
+            result.wei = self.wei * E18_SCALE // other.wei
+            return result
+        if isinstance(other, int):
+            result.wei = self.wei // other
+            return result
+        wei = self._wei_of(other)
+        if wei is None:
+            return NotImplemented
+        result.wei = self.wei * E18_SCALE // wei
+        return result
+
+    def __rtruediv__(self, other):
+        if isinstance(other, int):
+            return E18.from_wei(other * E18_SCALE * E18_SCALE // self.wei)
+        wei = self._wei_of(other)
+        if wei is None:
+            return NotImplemented
+        return E18.from_wei(wei * E18_SCALE // self.wei)
+
+    def __neg__(self):
+        return E18.from_wei(-self.wei)
+
+    def __abs__(self):
+        return E18.from_wei(abs(self.wei))
+
+    def __bool__(self):
+        return self.wei != 0
+
+    def _comparable(self, other, ordering=True):
+        """(self, other) as two values of one exactly comparable type, None for unsupported types
+
+        An ambiguous (nonzero) int raises for ordering and is unsupported for equality.
+        """
+        if other.__class__ is E18:
+            return self.wei, other.wei
+        if isinstance(other, int):
+            if other == 0:
+                return self.wei, 0
+            if not ordering:
+                return None
+            raise TypeError('ambiguous int operand, use E18(units) or E18.from_wei(wei)')
+        if isinstance(other, (float, Decimal)):
+            return self.to_decimal(), Decimal(other)
+        return None
+
+    def __eq__(self, other):
+        values = self._comparable(other, ordering=False)
+        return NotImplemented if values is None else values[0] == values[1]
+
+    def __ne__(self, other):
+        values = self._comparable(other, ordering=False)
+        return NotImplemented if values is None else values[0] != values[1]
+
+    def __lt__(self, other):
+        values = self._comparable(other)
+        return NotImplemented if values is None else values[0] < values[1]
+
+    def __le__(self, other):
+        values = self._comparable(other)
+        return NotImplemented if values is None else values[0] <= values[1]
+
+    def __gt__(self, other):
+        values = self._comparable(other)
+        return NotImplemented if values is None else values[0] > values[1]
+
+    def __ge__(self, other):
+        values = self._comparable(other)
+        return NotImplemented if values is None else values[0] >= values[1]
+
+    def __hash__(self):
+        # the hash of the Decimal value is the one of an equal float, an integral one that of the int
+        units, fraction = divmod(self.wei, E18_SCALE)
+        return hash(units) if fraction == 0 else hash(self.to_decimal())
+
+    def __float__(self):
+        return self.wei / E18_SCALE
+
+    def to_decimal(self):
+        return Decimal(self.wei).scaleb(-E18_DECIMALS, _DECIMAL_CONTEXT)
+
+    def __format__(self, spec):
+        if not spec:
+            return str(self)
+        return format(self.to_decimal(), spec)
+
+    def __str__(self):
+        integer, fraction = divmod(abs(self.wei), E18_SCALE)
+        sign = '-' if self.wei < 0 else ''
+        if fraction == 0:
+            return f'{sign}{integer}'
+        return f'{sign}{integer}.{fraction:018d}'.rstrip('0')
+
+    def __repr__(self):
+        return f"E18('{str(self)}')"
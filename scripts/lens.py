@@ -0,0 +1,81 @@
+from brownie import web3, UniV3LiquidityProviderLens, UniV3LiquidityProviderLensDeployless
+from collections import namedtuple
+from eth_abi import decode_abi
+from eth_utils import to_checksum_address
+
+
+# Field order matches UniV3LiquidityProviderLens.ProviderState
+ProviderState = namedtuple('ProviderState', [
+    'block_number',
+    'block_timestamp',
+
+    'admin',
+    'eth_amount',
+    'eth_balance',
+    'desired_tick',
+    'max_tick_deviation',
+    'min_allowed_desired_tick',
+    'max_allowed_desired_tick',
+    'position_lower_tick',
+    'position_upper_tick',
+    'desired_wsteth_amount',
+    'desired_weth_amount',
+    'min_wsteth_amount',
+    'min_weth_amount',
+    'liquidity_provided',
+    'liquidity_position_token_id',
+
+    'sqrt_price_x96',
+    'tick',
+    'pool_liquidity',
+    'fee_growth_global0_x128',
+    'fee_growth_global1_x128',
+    'lower_tick_fee_growth_outside0_x128',
+    'lower_tick_fee_growth_outside1_x128',
+    'upper_tick_fee_growth_outside0_x128',
+    'upper_tick_fee_growth_outside1_x128',
+
+    'position_liquidity',
+    'position_fee_growth_inside0_last_x128',
+    'position_fee_growth_inside1_last_x128',
+    'position_tokens_owed0',
+    'position_tokens_owed1',
+])
+
+
+def get_lens():
+    """Returns the latest deployed lens, None if there is none. Never deploys one"""
+    if len(UniV3LiquidityProviderLens) > 0:
+        return UniV3LiquidityProviderLens[-1]
+    return None
+
+
+def read_provider_state(provider, lens=None, block_identifier=None):
+    """Reads the state with `lens` or the latest deployed lens, with a deployless call if there is none"""
+    if lens is None:
+        lens = get_lens()
+    address = provider if isinstance(provider, str) else provider.address
+    if lens is None:
+        return read_provider_state_deployless(address, block_identifier)
+    return ProviderState(*lens.getState.call(address, block_identifier=block_identifier))
+
+
+def _get_state_output_types():
+    get_state_abi = next(item for item in UniV3LiquidityProviderLens.abi if item.get('name') == 'getState')
+    return [component['type'] for component in get_state_abi['outputs'][0]['components']]
+
+
+def read_provider_state_deployless(provider, block_identifier=None):
+    """eth_call of the UniV3LiquidityProviderLensDeployless creation code, sends no transaction
+
+    ProviderState has only static fields, so its encoding is the one of its fields in a row.
+    """
+    address = provider if isinstance(provider, str) else provider.address
+    data = UniV3LiquidityProviderLensDeployless.deploy.encode_input(address)
+    result = web3.eth.call({'data': data}, 'latest' if block_identifier is None else block_identifier)
+    state = ProviderState(*decode_abi(_get_state_output_types(), bytes(result)))
+    return state._replace(admin=to_checksum_address(state.admin))
+
+
+def deviation_from_desired_tick(state):
+    return abs(state.tick - state.desired_tick)
@@ -7,6 +7,7 @@ sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from config import *
 from .utils import *
+from .lens import read_provider_state, deviation_from_desired_tick
 
 
 def main(deployer=None, skip_confirmation=False):
@@ -19,14 +20,16 @@ def main(deployer=None, skip_confirmation=False):
     provider = UniV3LiquidityProvider.at(provider_address)
 
     desired_tick = MINT_DESIRED_TICK
+    state = read_provider_state(provider)
 
     print(
         f'Going to provide liquidity to Uni-v3 pool with the following parameters:\n'
-        f'  old desired tick: {provider.desiredTick()}\n'
+        f'  old desired tick: {state.desired_tick}\n'
         f'  new desired tick: {desired_tick}\n'
-        f'  max tick deviation: {provider.MAX_TICK_DEVIATION()}\n'
-        f'  eth to seed: {provider.ethAmount()}\n'
-        f'  eth on the contract: {formatE18(provider.balance())}\n'
+        f'  max tick deviation: {state.max_tick_deviation}\n'
+        f'  current pool tick: {state.tick} (deviation from old desired: {deviation_from_desired_tick(state)})\n'
+        f'  eth to seed: {state.eth_amount}\n'
+        f'  eth on the contract: {formatE18(state.eth_balance)}\n'
     )
 
     if not skip_confirmation:
@@ -0,0 +1,201 @@
+"""Submits a pre-signed mint as soon as the pool tick is in the allowed band
+
+The mint transaction is built and signed when the trigger is armed, so the
+only work left on the hot path is one slot0 eth_call per new block and the
+same checks mint() does before seeding: the deviation from the desired tick
+and the position range. The deviation band may be wider than the range where
+the position manager slippage check passes, so before broadcasting the mint
+is simulated with eth_call: a failing mint would use up the pre-signed nonce. Fees are fixed at arming time, re-arm if they become
+stale. Run with `brownie run mint_trigger main <account id>`.
+"""
+from brownie import accounts, web3, UniV3LiquidityProvider
+import time
+
+import sys
+import os.path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from config import *
+from .utils import *
+from . import fast_call
+from .deploy_and_mint import MINT_GAS_LIMIT
+from .lens import read_provider_state
+from .pipeline import legacy_gas_price
+
+
+class MintTriggerReport:
+    def __init__(self, tx_hash):
+        self.tx_hash = tx_hash
+        self.blocks_checked = 0
+        self.simulations_failed = 0
+        self.detected_block = None
+        self.detected_tick = None
+        self.detected_at = None
+        self.submitted_at = None
+        self.included_at = None
+        self.receipt = None
+
+    @property
+    def submission_latency(self):
+        return self.submitted_at - self.detected_at
+
+    @property
+    def inclusion_latency(self):
+        """Seconds from detecting the block with the tick in the band to seeing the receipt"""
+        return self.included_at - self.detected_at
+
+    @property
+    def inclusion_blocks(self):
+        return self.receipt['blockNumber'] - self.detected_block
+
+    @property
+    def succeeded(self):
+        return self.receipt is not None and self.receipt['status'] == 1
+
+    def __str__(self):
+        if self.submitted_at is None:
+            return (
+                f'not triggered, {self.blocks_checked} blocks checked,'
+                f' {self.simulations_failed} in the band with the mint simulation failing'
+            )
+        if self.receipt is None:
+            return (
+                f'mint {self.tx_hash} not included: submitted at block {self.detected_block}'
+                f' (tick {self.detected_tick}), no receipt before the timeout'
+            )
+        return (
+            f'mint {self.tx_hash} {"succeeded" if self.succeeded else "FAILED"}:\n'
+            f'  detected at block {self.detected_block} (tick {self.detected_tick}),'
+            f' included in block {self.receipt["blockNumber"]} (+{self.inclusion_blocks})\n'
+            f'  detection to submission (mint simulation included) {self.submission_latency * 1000:.1f} ms,'
+            f' detection to inclusion {self.inclusion_latency:.3f} s'
+        )
+
+
+class MintTrigger:
+    def __init__(self, provider, sender, desired_tick, gas_strategy=None, poll_interval=0.05):
+        assert hasattr(sender, 'private_key'), 'the mint is pre-signed, the sender needs a local private key'
+        self.provider = provider
+        self.sender = sender
+        self.desired_tick = desired_tick
+        self.gas_strategy = gas_strategy or legacy_gas_price()
+        self.poll_interval = poll_interval
+        self.pool = None
+        self.max_tick_deviation = None
+        self.position_range = None
+        self.call_params = None
+        self.raw_tx = None
+        self.tx_hash = None
+
+    def arm(self):
+        """Validates the mint parameters against the provider state and signs the mint"""
+        state = read_provider_state(self.provider)
+        if not state.min_allowed_desired_tick <= self.desired_tick <= state.max_allowed_desired_tick:
+            raise ValueError(f'desired tick {self.desired_tick} is out of the allowed range '
+                             f'[{state.min_allowed_desired_tick}, {state.max_allowed_desired_tick}]')
+        if not state.position_lower_tick < self.desired_tick < state.position_upper_tick:
+            raise ValueError(f'desired tick {self.desired_tick} is out of the position range')
+        if str(self.sender) not in (state.admin, LIDO_AGENT):
+            raise ValueError(f'{self.sender} is neither the provider admin nor the Lido agent')
+        if state.eth_balance < state.eth_amount:
+            raise ValueError(f'provider has {formatE18(state.eth_balance)} ETH, needs {formatE18(state.eth_amount)}')
+
+        self.pool = self.provider.POOL()
+        self.max_tick_deviation = state.max_tick_deviation
+        self.position_range = (state.position_lower_tick, state.position_upper_tick)
+
+        tx = dict(
+            to=str(self.provider),
+            data=self.provider.mint.encode_input(self.desired_tick),
+            value=0,
+            gas=MINT_GAS_LIMIT,
+            nonce=web3.eth.get_transaction_count(str(self.sender), 'pending'),
+            chainId=web3.eth.chain_id,
+            **self.gas_strategy()
+        )
+        self.call_params = {'from': str(self.sender), 'to': tx['to'], 'data': tx['data'], 'gas': hex(tx['gas'])}
+        signed = web3.eth.account.sign_transaction(tx, self.sender.private_key)
+        self.raw_tx = signed.rawTransaction.hex()
+        self.tx_hash = signed.hash.hex()
+        return self
+
+    def conditions_hold(self, tick):
+        """Same tick checks as mint() does before seeding, the slippage check is left to simulate()"""
+        lower_tick, upper_tick = self.position_range
+        return abs(tick - self.desired_tick) <= self.max_tick_deviation and lower_tick < tick < upper_tick
+
+    def simulate(self, block):
+        """eth_call of the mint on top of `block`, True if it doesn't revert"""
+        response = web3.provider.make_request('eth_call', [self.call_params, hex(block)])
+        return 'error' not in response
+
+    def run(self, max_blocks=None, timeout=None):
+        """Follows new blocks until the conditions hold, then submits the mint and waits for its receipt
+
+        @return MintTriggerReport, not triggered if `max_blocks` or `timeout` is reached first,
+                without a receipt if the mint isn't included before `timeout`
+        """
+        assert self.raw_tx is not None, 'call arm() first'
+        report = MintTriggerReport(self.tx_hash)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        last_block = None
+
+        while max_blocks is None or report.blocks_checked < max_blocks:
+            block = int(web3.provider.make_request('eth_blockNumber', [])['result'], 16)
+            if block == last_block:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return report
+                time.sleep(self.poll_interval)
+                continue
+
+            last_block = block
+            report.blocks_checked += 1
+            tick = fast_call.slot0(self.pool, block)[1]
+            if not self.conditions_hold(tick):
+                continue
+            detected_at = time.perf_counter()
+            if not self.simulate(block):
+                report.simulations_failed += 1
+                continue
+
+            report.detected_at = detected_at
+            report.detected_block, report.detected_tick = block, tick
+            self._submit(report)
+            self._wait_receipt(report, deadline)
+            return report
+        return report
+
+    def _submit(self, report):
+        response = web3.provider.make_request('eth_sendRawTransaction', [self.raw_tx])
+        report.submitted_at = time.perf_counter()
+        if 'error' in response:
+            raise ValueError(response['error'])
+
+    def _wait_receipt(self, report, deadline=None):
+        while deadline is None or time.perf_counter() <= deadline:
+            receipt = web3.provider.make_request('eth_getTransactionReceipt', [self.tx_hash])['result']
+            if receipt is not None:
+                report.included_at = time.perf_counter()
+                report.receipt = {
+                    'blockNumber': int(receipt['blockNumber'], 16),
+                    'status': int(receipt['status'], 16),
+                    'gasUsed': int(receipt['gasUsed'], 16),
+                }
+                return
+            time.sleep(self.poll_interval)
+
+
+def main(sender_id, desired_tick=MINT_DESIRED_TICK):
+    sender = accounts.load(sender_id)
+    provider = UniV3LiquidityProvider.at(read_deploy_address())
+
+    trigger = MintTrigger(provider, sender, int(desired_tick)).arm()
+    print(
+        f'Armed mint of {provider} with desired tick {trigger.desired_tick} '
+        f'(max deviation {trigger.max_tick_deviation}), tx {trigger.tx_hash}\n'
+        f'Waiting for the pool tick to get into [{trigger.desired_tick - trigger.max_tick_deviation}, '
+        f'{trigger.desired_tick + trigger.max_tick_deviation}]...'
+    )
+    report = trigger.run()
+    print(report)
+    return report
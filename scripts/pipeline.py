@@ -0,0 +1,174 @@
+"""Asynchronous transaction pipeline
+
+Transactions are submitted back to back with locally managed nonces and their
+receipts are polled concurrently, so a chain of transactions (e.g. fund ->
+mint) may land in a single block instead of one block per blocking brownie
+call. Transactions depending on an earlier one succeeding go to a later stage
+of `run_stages`. A failed send resets the nonce manager, so no gap is left.
+"""
+from brownie import web3
+from brownie.convert import to_address
+from concurrent.futures import ThreadPoolExecutor
+from eth_utils import keccak
+from web3.exceptions import TransactionNotFound
+import asyncio
+import rlp
+import threading
+import time
+
+
+def compute_contract_address(sender, nonce):
+    """Address of the contract deployed by `sender` with transaction `nonce`"""
+    return to_address(keccak(rlp.encode([bytes.fromhex(str(sender)[2:]), nonce]))[12:])
+
+
+class NonceManager:
+    """Hands out consecutive nonces without waiting for previous transactions to be mined"""
+
+    def __init__(self, address):
+        self.address = str(address)
+        self._lock = threading.Lock()
+        self._next = None
+
+    def next(self):
+        with self._lock:
+            if self._next is None:
+                self._next = web3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def peek(self, offset=0):
+        with self._lock:
+            if self._next is None:
+                self._next = web3.eth.get_transaction_count(self.address, 'pending')
+            return self._next + offset
+
+    def reset(self):
+        with self._lock:
+            self._next = None
+
+
+# Gas price strategy hooks: callables returning the fee fields of a transaction
+
+def legacy_gas_price(multiplier=1.0):
+    def strategy():
+        return {'gasPrice': int(web3.eth.gas_price * multiplier)}
+    return strategy
+
+
+def eip1559_fees(priority_fee, max_fee_multiplier=2):
+    def strategy():
+        base_fee = web3.eth.get_block('latest')['baseFeePerGas']
+        return {
+            'maxPriorityFeePerGas': priority_fee,
+            'maxFeePerGas': base_fee * max_fee_multiplier + priority_fee,
+        }
+    return strategy
+
+
+class PipelineStep:
+    def __init__(self, name, nonce):
+        self.name = name
+        self.nonce = nonce
+        self.tx_hash = None
+        self.submitted_at = None
+        self.mined_at = None
+        self.receipt = None
+
+    @property
+    def latency(self):
+        if self.mined_at is None:
+            return None
+        return self.mined_at - self.submitted_at
+
+    @property
+    def succeeded(self):
+        return self.receipt is not None and self.receipt['status'] == 1
+
+
+class TxPipeline:
+    def __init__(self, sender, gas_strategy=None, poll_interval=0.2, timeout=600, max_workers=8):
+        self.sender = sender
+        self.nonces = NonceManager(sender)
+        self.gas_strategy = gas_strategy or legacy_gas_price()
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.steps = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def next_contract_address(self, offset=0):
+        """Address of a contract deployed by the `offset`-th next submitted transaction"""
+        return compute_contract_address(self.sender, self.nonces.peek(offset))
+
+    async def submit(self, name, tx):
+        """Fills nonce, chain id and fees of `tx`, sends it and returns the step without waiting"""
+        step = PipelineStep(name, self.nonces.next())
+        tx = dict(tx, nonce=step.nonce, chainId=web3.eth.chain_id, **self.gas_strategy())
+        tx['from'] = str(self.sender)
+        tx.setdefault('value', 0)
+
+        loop = asyncio.get_running_loop()
+        step.submitted_at = time.perf_counter()
+        try:
+            step.tx_hash = await loop.run_in_executor(self._executor, self._send, tx)
+        except Exception:
+            # the nonce wasn't used, re-read it from the node so that no gap is left
+            self.nonces.reset()
+            raise
+        self.steps.append(step)
+        return step
+
+    async def wait(self, step):
+        loop = asyncio.get_running_loop()
+        deadline = step.submitted_at + self.timeout
+        while True:
+            try:
+                step.receipt = await loop.run_in_executor(
+                    self._executor, web3.eth.get_transaction_receipt, step.tx_hash)
+                step.mined_at = time.perf_counter()
+                return step
+            except TransactionNotFound:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f'{step.name}: transaction {step.tx_hash.hex()} is not mined')
+                await asyncio.sleep(self.poll_interval)
+
+    async def run(self, named_txs):
+        """Submits all transactions in order, then waits for all receipts concurrently"""
+        steps = [await self.submit(name, tx) for name, tx in named_txs]
+        await asyncio.gather(*[self.wait(step) for step in steps])
+
+        failed = [step.name for step in steps if not step.succeeded]
+        if failed:
+            raise RuntimeError(f'transactions failed: {failed}')
+        return steps
+
+    async def run_stages(self, stages):
+        """Runs (check, named_txs) stages one after another
+
+        A stage is submitted only when all transactions of the previous stages
+        succeeded and its `check` (if any) returns True, so transactions
+        depending on an earlier one are never sent if it failed.
+        """
+        steps = []
+        for check, named_txs in stages:
+            if check is not None and not check():
+                raise RuntimeError(f'check before {[name for name, _ in named_txs]} failed')
+            steps += await self.run(named_txs)
+        return steps
+
+    def report(self):
+        blocks = sorted({step.receipt['blockNumber'] for step in self.steps if step.receipt is not None})
+        lines = [f'{len(self.steps)} transactions in {len(blocks)} block(s)']
+        for step in self.steps:
+            lines.append(
+                f'  {step.name}: nonce {step.nonce}, block {step.receipt["blockNumber"]}, '
+                f'gas used {step.receipt["gasUsed"]}, latency {step.latency:.3f}s'
+            )
+        return '\n'.join(lines)
+
+    def _send(self, tx):
+        if hasattr(self.sender, 'private_key'):
+            signed = web3.eth.account.sign_transaction(tx, self.sender.private_key)
+            return web3.eth.send_raw_transaction(signed.rawTransaction)
+        return web3.eth.send_transaction(tx)
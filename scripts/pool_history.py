@@ -0,0 +1,212 @@
+"""Append-only columnar store of the pool state per block
+
+Every column is a raw file of fixed-width little-endian values, memory-mapped
+with numpy. Integers wider than 64 bits are split into 64-bit limbs (least
+significant first), one row of the 2-d array per block. Rows are ordered by
+block number, so the block column is the index: range queries are binary
+searches returning views of the mapped files, nothing is copied. meta.json
+holds the row count and is replaced atomically after the data is flushed, so
+an interrupted ingestion leaves the store at the last completed batch.
+
+Run with `brownie run pool_history main <from block>` to ingest up to the
+latest block (archive node needed for old blocks).
+"""
+from brownie import web3
+from concurrent.futures import ThreadPoolExecutor
+import json
+import numpy as np
+import os
+
+import sys
+import os.path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from config import *
+from . import fast_call
+
+
+# name, dtype, number of 64-bit limbs (1 for plain columns)
+COLUMNS = (
+    ('block', 'int64', 1),
+    ('timestamp', 'int64', 1),
+    ('tick', 'int32', 1),
+    ('sqrt_price_x96', 'uint64', 3),
+    ('liquidity', 'uint64', 2),
+    ('fee_growth_global0_x128', 'uint64', 4),
+    ('fee_growth_global1_x128', 'uint64', 4),
+    ('st_eth_per_token', 'uint64', 2),
+)
+
+INITIAL_CAPACITY = 1 << 16
+LIMB_MASK = (1 << 64) - 1
+
+
+def get_default_store_path():
+    return os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)),
+        'pool-history'
+    )
+
+
+def limbs_to_ints(limbs):
+    """Python ints of a wide column (rows of limbs)"""
+    return [sum(int(limb) << (64 * i) for i, limb in enumerate(row)) for row in limbs]
+
+
+def limbs_to_floats(limbs):
+    """float64 approximation of a wide column, vectorized"""
+    scales = np.ldexp(1.0, 64 * np.arange(limbs.shape[1]))
+    return limbs.astype(np.float64) @ scales
+
+
+def _to_limbs(values, width):
+    limbs = np.empty((len(values), width), dtype=np.uint64)
+    for i in range(width):
+        limbs[:, i] = [(value >> (64 * i)) & LIMB_MASK for value in values]
+    return limbs
+
+
+class PoolHistoryStore:
+    def __init__(self, path=None):
+        self.path = path or get_default_store_path()
+        os.makedirs(self.path, exist_ok=True)
+        meta = self._read_meta()
+        if meta is None:
+            meta = {'count': 0, 'capacity': INITIAL_CAPACITY, 'columns': COLUMNS}
+            self._resize_files(meta['capacity'])
+            self._write_meta(meta)
+        if [tuple(column) for column in meta['columns']] != list(COLUMNS):
+            raise ValueError(f'{self.path} has different columns, remove it to re-ingest')
+        self.count = meta['count']
+        self.capacity = meta['capacity']
+        self._arrays = self._map()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def last_block(self):
+        return int(self._arrays['block'][self.count - 1]) if self.count else None
+
+    def column(self, name):
+        return self._arrays[name][:self.count]
+
+    def range(self, from_block, to_block):
+        """Views of all columns for the stored blocks in [from_block, to_block]"""
+        blocks = self.column('block')
+        lo = np.searchsorted(blocks, from_block, side='left')
+        hi = np.searchsorted(blocks, to_block, side='right')
+        return {name: self._arrays[name][lo:hi] for name, _, _ in COLUMNS}
+
+    def index_at(self, block):
+        """Row of the latest stored block <= `block`, None if there is none"""
+        index = int(np.searchsorted(self.column('block'), block, side='right')) - 1
+        return index if index >= 0 else None
+
+    def append(self, rows):
+        """Appends rows of values in the COLUMNS order, blocks must be increasing"""
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        blocks = np.asarray(columns[0], dtype=np.int64)
+        if np.any(np.diff(blocks) <= 0) or (self.count and blocks[0] <= self.last_block):
+            raise ValueError('blocks must be appended in increasing order')
+
+        if self.count + len(rows) > self.capacity:
+            self._grow(self.count + len(rows))
+
+        start, end = self.count, self.count + len(rows)
+        for (name, dtype, width), values in zip(COLUMNS, columns):
+            if width == 1:
+                self._arrays[name][start:end] = np.asarray(values, dtype=dtype)
+            else:
+                self._arrays[name][start:end] = _to_limbs(values, width)
+        for array in self._arrays.values():
+            array.flush()
+
+        self.count = end
+        self._write_meta({'count': self.count, 'capacity': self.capacity, 'columns': COLUMNS})
+
+    def _grow(self, min_capacity):
+        capacity = self.capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        self._arrays = None  # unmap before resizing
+        self._resize_files(capacity)
+        self.capacity = capacity
+        self._write_meta({'count': self.count, 'capacity': self.capacity, 'columns': COLUMNS})
+        self._arrays = self._map()
+
+    def _column_file(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+    def _resize_files(self, capacity):
+        for name, dtype, width in COLUMNS:
+            with open(self._column_file(name), 'ab') as fp:
+                fp.truncate(capacity * width * np.dtype(dtype).itemsize)
+
+    def _map(self):
+        return {
+            name: np.memmap(
+                self._column_file(name), dtype=np.dtype(dtype).newbyteorder('<'), mode='r+',
+                shape=(self.capacity,) if width == 1 else (self.capacity, width)
+            )
+            for name, dtype, width in COLUMNS
+        }
+
+    def _meta_file(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def _read_meta(self):
+        if not os.path.exists(self._meta_file()):
+            return None
+        with open(self._meta_file(), 'r') as fp:
+            return json.load(fp)
+
+    def _write_meta(self, meta):
+        tmp_file = self._meta_file() + '.tmp'
+        with open(tmp_file, 'w') as fp:
+            json.dump(meta, fp)
+        os.replace(tmp_file, self._meta_file())
+
+
+def read_row(pool, wsteth, block):
+    """Row of the store for `block`"""
+    timestamp = int(web3.provider.make_request('eth_getBlockByNumber', [hex(block), False])['result']['timestamp'], 16)
+    sqrt_price_x96, tick, *_ = fast_call.slot0(pool, block)
+    return (
+        block,
+        timestamp,
+        tick,
+        sqrt_price_x96,
+        fast_call.liquidity(pool, block),
+        fast_call.fee_growth_global0_x128(pool, block),
+        fast_call.fee_growth_global1_x128(pool, block),
+        fast_call.st_eth_per_token(wsteth, block),
+    )
+
+
+def ingest(store, pool, wsteth, from_block=None, to_block=None, step=1, batch_size=256, max_workers=16):
+    """Fetches and appends every `step`-th block after the last stored one (or from `from_block`)
+
+    @return number of appended rows
+    """
+    if store.last_block is not None:
+        from_block = store.last_block + step
+    assert from_block is not None, 'empty store, from_block is required'
+    if to_block is None:
+        to_block = web3.eth.block_number
+
+    blocks = range(from_block, to_block + 1, step)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch_start in range(0, len(blocks), batch_size):
+            batch = blocks[batch_start:batch_start + batch_size]
+            store.append(list(executor.map(lambda block: read_row(pool, wsteth, block), batch)))
+    return len(blocks)
+
+
+def main(from_block=None, step=1):
+    store = PoolHistoryStore()
+    appended = ingest(
+        store, POOL, WSTETH_TOKEN, None if from_block is None else int(from_block), step=int(step))
+    print(f'{appended} blocks appended, {len(store)} blocks stored up to {store.last_block}')
@@ -0,0 +1,95 @@
+"""Reading and directly writing UniswapV3Pool state on a local chain
+
+set_pool_price() puts the pool at an exact tick/sqrtPrice by writing its
+storage, crossing the initialized ticks in between the same way a swap does
+(active liquidity and the "outside" accumulators of the crossed ticks are
+updated), so positions and fees stay consistent. Oracle observations are not
+written. Requires a node supporting one of the set-storage RPC methods
+(ganache v7, hardhat, anvil).
+"""
+from brownie import web3
+from eth_utils import keccak
+
+from .pools import get_initialized_ticks
+from .univ3_math import get_sqrt_ratio_at_tick, get_tick_at_sqrt_ratio
+
+
+# Storage layout of UniswapV3Pool
+SLOT0_SLOT = 0
+LIQUIDITY_SLOT = 4
+TICKS_SLOT = 5
+
+UINT256_MOD = 1 << 256
+
+_SET_STORAGE_METHODS = ('evm_setAccountStorageAt', 'hardhat_setStorageAt', 'anvil_setStorageAt')
+
+
+def tick_info_slot(tick):
+    return int.from_bytes(keccak((tick % UINT256_MOD).to_bytes(32, 'big') + TICKS_SLOT.to_bytes(32, 'big')), 'big')
+
+
+def read_storage(address, slot):
+    return int.from_bytes(web3.eth.get_storage_at(str(address), slot), 'big')
+
+
+def write_storage(address, slot, value):
+    padded_value = '0x' + (value % UINT256_MOD).to_bytes(32, 'big').hex()
+    for method in _SET_STORAGE_METHODS:
+        slot_param = '0x' + slot.to_bytes(32, 'big').hex() if method == 'evm_setAccountStorageAt' else hex(slot)
+        response = web3.provider.make_request(method, [str(address), slot_param, padded_value])
+        if 'error' not in response:
+            return
+    raise RuntimeError(f'the node supports none of {_SET_STORAGE_METHODS}, use ganache v7+, hardhat or anvil')
+
+
+def _cross_tick(pool, tick, tick_cumulative, seconds_per_liquidity_x128, timestamp):
+    """Same updates as Tick.cross(), returns liquidityNet of the tick"""
+    (_, liquidity_net, fee_growth_outside0_x128, fee_growth_outside1_x128, tick_cumulative_outside,
+     seconds_per_liquidity_outside_x128, seconds_outside, initialized) = pool.ticks(tick)
+    slot = tick_info_slot(tick)
+
+    write_storage(pool.address, slot + 1, pool.feeGrowthGlobal0X128() - fee_growth_outside0_x128)
+    write_storage(pool.address, slot + 2, pool.feeGrowthGlobal1X128() - fee_growth_outside1_x128)
+    write_storage(pool.address, slot + 3,
+        ((tick_cumulative - tick_cumulative_outside) % (1 << 56))
+        | (((seconds_per_liquidity_x128 - seconds_per_liquidity_outside_x128) % (1 << 160)) << 56)
+        | (((timestamp - seconds_outside) % (1 << 32)) << 216)
+        | (int(initialized) << 248)
+    )
+    return liquidity_net
+
+
+def set_pool_price(pool, tick=None, sqrt_price_x96=None):
+    """Moves the pool to `tick` (at its lower boundary) or to the exact `sqrt_price_x96`
+
+    @return (sqrtPriceX96, tick) the pool is at
+    """
+    assert (tick is None) != (sqrt_price_x96 is None), 'specify either tick or sqrt_price_x96'
+    if sqrt_price_x96 is None:
+        sqrt_price_x96 = get_sqrt_ratio_at_tick(tick)
+    else:
+        tick = get_tick_at_sqrt_ratio(sqrt_price_x96)
+
+    current_tick = pool.slot0()[1]
+    liquidity = pool.liquidity()
+
+    # accumulators as of the latest block, as a swap would observe them
+    (tick_cumulative, ), (seconds_per_liquidity_x128, ) = pool.observe([0])
+    timestamp = web3.eth.get_block('latest')['timestamp']
+
+    if tick > current_tick:
+        for crossed in get_initialized_ticks(pool, current_tick + 1, tick):
+            liquidity += _cross_tick(pool, crossed, tick_cumulative, seconds_per_liquidity_x128, timestamp)
+    elif tick < current_tick:
+        for crossed in reversed(get_initialized_ticks(pool, tick + 1, current_tick)):
+            liquidity -= _cross_tick(pool, crossed, tick_cumulative, seconds_per_liquidity_x128, timestamp)
+
+    assert liquidity >= 0
+    write_storage(pool.address, LIQUIDITY_SLOT, liquidity)
+
+    slot0 = read_storage(pool.address, SLOT0_SLOT)
+    slot0 = (slot0 >> 184 << 184) | ((tick % (1 << 24)) << 160) | sqrt_price_x96
+    write_storage(pool.address, SLOT0_SLOT, slot0)
+
+    assert tuple(pool.slot0()[:2]) == (sqrt_price_x96, tick)
+    return sqrt_price_x96, tick
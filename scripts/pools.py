@@ -0,0 +1,165 @@
+"""Registry of the pools from config.POOLS and concurrent scans over them
+
+Pools are resolved via the Uniswap V3 factory, fee tiers without a deployed
+pool are skipped. All reads of a scan are pinned to one block, so the
+snapshots of different pools are consistent with each other. Also holds the
+read-only tick bitmap walk shared by the scripts. Run with
+`brownie run pools` to print the state and position sizing of every pool.
+"""
+from brownie import interface, web3, ZERO_ADDRESS
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import sys
+import os.path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from config import *
+from .ratio_table import RatioTable
+from .univ3_math import WSTETH_DUMMY_AMOUNT
+from .utils import formatE18
+
+
+PoolConfig = namedtuple('PoolConfig', ['name', 'token0', 'token1', 'fee', 'position_lower_tick', 'position_upper_tick'])
+
+RegisteredPool = namedtuple('RegisteredPool', ['config', 'address', 'tick_spacing', 'position_lower_tick', 'position_upper_tick'])
+
+PoolSnapshot = namedtuple('PoolSnapshot', [
+    'name',
+    'address',
+    'fee',
+    'block_number',
+    'sqrt_price_x96',
+    'tick',
+    'liquidity',
+    'token0_balance',
+    'token1_balance',
+])
+
+# scans are I/O bound, one thread per pool up to this limit
+MAX_SCAN_WORKERS = 32
+
+
+def get_pool_configs(pools=POOLS):
+    return [PoolConfig(name, *params) for name, params in pools.items()]
+
+
+def align_position_range(lower_tick, upper_tick, tick_spacing):
+    """Widens the range to the closest ticks usable for positions in a pool with `tick_spacing`"""
+    return lower_tick // tick_spacing * tick_spacing, -(-upper_tick // tick_spacing) * tick_spacing
+
+
+def get_initialized_ticks(pool, tick_from, tick_to, tick_spacing=None, block_identifier='latest'):
+    """Initialized ticks in [tick_from, tick_to], ascending, found via the pool tick bitmap"""
+    if tick_spacing is None:
+        tick_spacing = pool.tickSpacing(block_identifier=block_identifier)
+    compressed_from = tick_from // tick_spacing
+    compressed_to = tick_to // tick_spacing
+
+    ticks = []
+    for word_pos in range(compressed_from >> 8, (compressed_to >> 8) + 1):
+        word = pool.tickBitmap(word_pos, block_identifier=block_identifier)
+        while word:
+            bit_pos = (word & -word).bit_length() - 1
+            word &= word - 1
+            tick = ((word_pos << 8) + bit_pos) * tick_spacing
+            if tick_from <= tick <= tick_to:
+                ticks.append(tick)
+    return ticks
+
+
+def _resolve(factory, config):
+    address = factory.getPool(config.token0, config.token1, config.fee)
+    if address == ZERO_ADDRESS:
+        return None
+    tick_spacing = factory.feeAmountTickSpacing(config.fee)
+    return RegisteredPool(
+        config, address, tick_spacing,
+        *align_position_range(config.position_lower_tick, config.position_upper_tick, tick_spacing)
+    )
+
+
+def discover_pools(configs=None, factory=None):
+    """@return RegisteredPool for every config that has a deployed pool, in the configs order"""
+    if configs is None:
+        configs = get_pool_configs()
+    if factory is None:
+        factory = interface.IUniswapV3Factory(UNISWAP_V3_FACTORY)
+    resolved = scan_pools(configs, lambda config: _resolve(factory, config))
+    return [pool for pool in resolved if pool is not None]
+
+
+def scan_pools(items, fn, max_workers=MAX_SCAN_WORKERS):
+    """Applies `fn` to every item concurrently, returns the results in the items order"""
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(fn, items))
+
+
+def read_pool_snapshot(registered_pool, block_identifier):
+    pool = interface.IUniswapV3Pool(registered_pool.address)
+    sqrt_price_x96, tick, *_ = pool.slot0(block_identifier=block_identifier)
+    return PoolSnapshot(
+        registered_pool.config.name,
+        registered_pool.address,
+        registered_pool.config.fee,
+        block_identifier,
+        sqrt_price_x96,
+        tick,
+        pool.liquidity(block_identifier=block_identifier),
+        interface.ERC20(registered_pool.config.token0).balanceOf(pool, block_identifier=block_identifier),
+        interface.ERC20(registered_pool.config.token1).balanceOf(pool, block_identifier=block_identifier),
+    )
+
+
+def read_pool_snapshots(registered_pools, block_identifier=None):
+    if block_identifier is None:
+        block_identifier = web3.eth.block_number
+    return scan_pools(registered_pools, lambda pool: read_pool_snapshot(pool, block_identifier))
+
+
+_ratio_tables = {}
+
+
+def get_ratio_table(registered_pool):
+    """Ratio table of the pool position range, shared by the pools with the same range"""
+    key = (registered_pool.position_lower_tick, registered_pool.position_upper_tick)
+    if key not in _ratio_tables:
+        _ratio_tables[key] = RatioTable(lower_tick=key[0], upper_tick=key[1])
+    return _ratio_tables[key]
+
+
+def size_position(registered_pool, tick, eth_amount, steth_by_dummy_wsteth, max_tick_deviation=MAX_TICK_DEVIATION):
+    """Desired and min wstETH/WETH amounts for a position in the pool with the desired tick `tick`
+
+    @return (desiredWsteth, desiredWeth, minWsteth, minWeth)
+    """
+    table = get_ratio_table(registered_pool)
+    table.update_rate(steth_by_dummy_wsteth)
+    return table.desired_and_min_token_amounts(tick, max_tick_deviation, eth_amount)
+
+
+def main():
+    registered_pools = discover_pools()
+    snapshots = read_pool_snapshots(registered_pools)
+    steth_by_dummy_wsteth = interface.WSTETH(WSTETH_TOKEN).getStETHByWstETH(WSTETH_DUMMY_AMOUNT)
+
+    for registered_pool, snapshot in zip(registered_pools, snapshots):
+        print(
+            f'{snapshot.name} ({snapshot.address}) at block {snapshot.block_number}:\n'
+            f'  tick = {snapshot.tick}, active liquidity = {snapshot.liquidity}\n'
+            f'  token0 / token1 in pool = {formatE18(snapshot.token0_balance)} / {formatE18(snapshot.token1_balance)}\n'
+            f'  position range = [{registered_pool.position_lower_tick}, {registered_pool.position_upper_tick}]'
+        )
+        if registered_pool.position_lower_tick < snapshot.tick - MAX_TICK_DEVIATION \
+                and snapshot.tick + MAX_TICK_DEVIATION < registered_pool.position_upper_tick:
+            desired_wsteth, desired_weth, min_wsteth, min_weth = size_position(
+                registered_pool, snapshot.tick, ETH_TO_SEED, steth_by_dummy_wsteth)
+            print(
+                f'  desired wsteth / weth for {formatE18(ETH_TO_SEED)} eth = '
+                f'{formatE18(desired_wsteth)} / {formatE18(desired_weth)}\n'
+                f'  min wsteth / weth = {formatE18(min_wsteth)} / {formatE18(min_weth)}\n'
+            )
+        else:
+            print('  the pool price is too close to the position range edges\n')
@@ -0,0 +1,56 @@
+from collections import namedtuple
+
+from .lens import read_provider_state
+from .univ3_math import get_amounts_for_burn, get_fee_growth_inside, get_fees_owed, MAX_UINT128
+
+
+# Same values closeLiquidityPosition() returns
+ClosePreview = namedtuple('ClosePreview', ['amount0', 'amount1', 'amount0_fees', 'amount1_fees'])
+
+
+def preview_close_liquidity_position(state):
+    """Exit amounts and fees of closeLiquidityPosition() for the state read by the lens
+
+    Mirrors NonfungiblePositionManager.decreaseLiquidity() (pool burn of the whole
+    liquidity + fees accrued since the last position update) followed by collect().
+    """
+    assert state.liquidity_position_token_id != 0, 'no liquidity position'
+
+    amount0, amount1 = get_amounts_for_burn(
+        state.sqrt_price_x96,
+        state.tick,
+        state.position_lower_tick,
+        state.position_upper_tick,
+        state.liquidity_provided,
+    )
+
+    fee_growth_inside0_x128 = get_fee_growth_inside(
+        state.tick,
+        state.position_lower_tick,
+        state.position_upper_tick,
+        state.lower_tick_fee_growth_outside0_x128,
+        state.upper_tick_fee_growth_outside0_x128,
+        state.fee_growth_global0_x128,
+    )
+    fee_growth_inside1_x128 = get_fee_growth_inside(
+        state.tick,
+        state.position_lower_tick,
+        state.position_upper_tick,
+        state.lower_tick_fee_growth_outside1_x128,
+        state.upper_tick_fee_growth_outside1_x128,
+        state.fee_growth_global1_x128,
+    )
+
+    # tokensOwed are uint128 in the position manager
+    amount0_fees = (state.position_tokens_owed0 + get_fees_owed(
+        fee_growth_inside0_x128, state.position_fee_growth_inside0_last_x128, state.position_liquidity
+    )) % (MAX_UINT128 + 1)
+    amount1_fees = (state.position_tokens_owed1 + get_fees_owed(
+        fee_growth_inside1_x128, state.position_fee_growth_inside1_last_x128, state.position_liquidity
+    )) % (MAX_UINT128 + 1)
+
+    return ClosePreview(amount0, amount1, amount0_fees, amount1_fees)
+
+
+def preview_close(provider, lens=None, block_identifier=None):
+    return preview_close_liquidity_position(read_provider_state(provider, lens, block_identifier))
@@ -0,0 +1,89 @@
+"""Precomputed per-tick desired tokens ratio of the liquidity position
+
+_calcDesiredTokensRatio depends only on the tick and the position range, so
+the ratios are computed once for the whole range, persisted to disk and loaded
+lazily. Token amounts are then sized in O(1) by combining the cached ratio
+with the wstETH rate, which is the only part that changes over time.
+"""
+import json
+import os
+
+from .univ3_math import (
+    calc_desired_tokens_ratio,
+    calc_token_amounts_for_ratio,
+    POSITION_LOWER_TICK,
+    POSITION_UPPER_TICK,
+    WSTETH_DUMMY_AMOUNT,
+)
+
+
+def get_default_table_path(lower_tick=POSITION_LOWER_TICK, upper_tick=POSITION_UPPER_TICK):
+    if (lower_tick, upper_tick) == (POSITION_LOWER_TICK, POSITION_UPPER_TICK):
+        file_name = 'ratio-table.json'
+    else:
+        file_name = f'ratio-table_{lower_tick}_{upper_tick}.json'
+    return os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)),
+        file_name
+    )
+
+
+class RatioTable:
+    def __init__(self, path=None, lower_tick=POSITION_LOWER_TICK, upper_tick=POSITION_UPPER_TICK):
+        self.path = path or get_default_table_path(lower_tick, upper_tick)
+        self.lower_tick = lower_tick
+        self.upper_tick = upper_tick
+        self.steth_by_dummy_wsteth = None
+        self._ratios = None
+
+    @property
+    def ratios(self):
+        """Ratios for ticks lower_tick + 1 .. upper_tick - 1 (no ratio at the range edges)"""
+        if self._ratios is None:
+            self._ratios = self._load() or self._build_and_save()
+        return self._ratios
+
+    def ratio(self, tick):
+        if not self.lower_tick < tick < self.upper_tick:
+            raise ValueError(f'tick {tick} is out of the position range ({self.lower_tick}, {self.upper_tick})')
+        return self.ratios[tick - self.lower_tick - 1]
+
+    def update_rate(self, steth_by_dummy_wsteth):
+        """@param steth_by_dummy_wsteth wstETH.getStETHByWstETH(WSTETH_DUMMY_AMOUNT)"""
+        self.steth_by_dummy_wsteth = steth_by_dummy_wsteth
+
+    def refresh_rate(self, wsteth_token):
+        self.update_rate(wsteth_token.getStETHByWstETH(WSTETH_DUMMY_AMOUNT))
+
+    def desired_token_amounts(self, tick, eth_amount):
+        """Same as UniV3LiquidityProvider._calcDesiredTokenAmounts"""
+        assert self.steth_by_dummy_wsteth is not None, 'wstETH rate is not set'
+        return calc_token_amounts_for_ratio(self.ratio(tick), eth_amount, self.steth_by_dummy_wsteth)
+
+    def desired_and_min_token_amounts(self, desired_tick, max_tick_deviation, eth_amount):
+        """Same as UniV3LiquidityProvider._calcDesiredAndMinTokenAmounts
+
+        @return (desiredWsteth, desiredWeth, minWsteth, minWeth)
+        """
+        desired_wsteth, desired_weth = self.desired_token_amounts(desired_tick, eth_amount)
+        _, min_weth = self.desired_token_amounts(desired_tick - max_tick_deviation, eth_amount)
+        min_wsteth, _ = self.desired_token_amounts(desired_tick + max_tick_deviation, eth_amount)
+        return desired_wsteth, desired_weth, min_wsteth, min_weth
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as fp:
+            data = json.load(fp)
+        if (data['lower_tick'], data['upper_tick']) != (self.lower_tick, self.upper_tick):
+            return None
+        return data['ratios']
+
+    def _build_and_save(self):
+        ratios = [
+            calc_desired_tokens_ratio(tick, self.lower_tick, self.upper_tick)
+            for tick in range(self.lower_tick + 1, self.upper_tick)
+        ]
+        with open(self.path, 'w') as fp:
+            json.dump({'lower_tick': self.lower_tick, 'upper_tick': self.upper_tick, 'ratios': ratios}, fp)
+        return ratios
@@ -0,0 +1,209 @@
+"""Record/replay JSON-RPC proxy for forked test runs.
+
+Ganache forks mainnet by talking JSON-RPC to an upstream node. The proxy sits
+between them: in `record` mode every successful upstream response is stored
+in a gzipped JSON cassette (errors are passed through, not recorded), in `replay` mode responses are served from the cassette only,
+so the tests run without network access.
+
+Usage as a standalone process:
+
+    python scripts/rpc_cassette.py record --upstream https://... --cassette tests/cassettes/mainnet.json.gz
+    python scripts/rpc_cassette.py replay --cassette tests/cassettes/mainnet.json.gz
+
+and point `fork` in brownie-config.yaml to http://127.0.0.1:8546.
+tests/conftest.py starts the proxy automatically when RPC_CASSETTE is set.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+import urllib.request
+
+
+DEFAULT_PORT = 8546
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+def request_key(method, params):
+    return json.dumps([method, params], sort_keys=True, separators=(',', ':'))
+
+
+class Cassette:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            with gzip.open(path, 'rt') as fp:
+                self.entries = json.load(fp)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, response, elapsed):
+        """Records a successful response, errors may be transient so they are never recorded"""
+        if 'error' in response:
+            return
+        self.entries[key] = {'result': response.get('result'), 'elapsed': round(elapsed, 6)}
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, 'wt') as fp:
+            json.dump(self.entries, fp, sort_keys=True, separators=(',', ':'))
+        self.dirty = False
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        self.failed = 0
+        self.upstream_time = 0.0
+        self.serve_time = 0.0
+
+    def add(self, kind, serve_time, upstream_time):
+        with self.lock:
+            self.calls += 1
+            setattr(self, kind, getattr(self, kind) + 1)
+            self.serve_time += serve_time
+            self.upstream_time += upstream_time
+
+    def summary(self, mode):
+        lines = [
+            f'rpc cassette ({mode}): {self.calls} calls, '
+            f'{self.recorded} recorded, {self.replayed} replayed, {self.missed} missed, {self.failed} failed upstream',
+            f'  time spent serving: {self.serve_time:.3f}s',
+            f'  upstream time ({"live" if mode == RECORD else "as recorded"}): {self.upstream_time:.3f}s',
+        ]
+        if mode == REPLAY and self.serve_time > 0:
+            lines.append(f'  speedup over live forking: {self.upstream_time / self.serve_time:.1f}x')
+        return '\n'.join(lines)
+
+
+class CassetteProxy:
+    def __init__(self, cassette_path, mode, upstream=None, port=DEFAULT_PORT, timeout=120):
+        assert mode in (RECORD, REPLAY), f'unknown mode {mode}'
+        if mode == RECORD and not upstream:
+            raise ValueError('upstream url is required for recording')
+
+        self.cassette = Cassette(cassette_path)
+        self.mode = mode
+        self.upstream = upstream
+        self.timeout = timeout
+        self.stats = Stats()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            self.cassette.save()
+
+    def handle(self, payload):
+        if isinstance(payload, list):
+            return [self._handle_single(request) for request in payload]
+        return self._handle_single(payload)
+
+    def _handle_single(self, request):
+        started = time.perf_counter()
+        key = request_key(request.get('method'), request.get('params', []))
+
+        with self._lock:
+            entry = self.cassette.get(key)
+
+        if entry is not None:
+            kind, upstream_time = 'replayed', entry['elapsed']
+        elif self.mode == REPLAY:
+            self.stats.add('missed', time.perf_counter() - started, 0.0)
+            return {
+                'jsonrpc': '2.0',
+                'id': request.get('id'),
+                'error': {'code': -32000, 'message': f'request is not in the cassette: {key}'},
+            }
+        else:
+            response = self._forward(request)
+            upstream_time = time.perf_counter() - started
+            if 'error' in response:
+                self.stats.add('failed', time.perf_counter() - started, upstream_time)
+                return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': response['error']}
+            with self._lock:
+                self.cassette.put(key, response, upstream_time)
+                entry = self.cassette.get(key)
+            kind = 'recorded'
+
+        self.stats.add(kind, time.perf_counter() - started, upstream_time)
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': entry['result']}
+
+    def _forward(self, request):
+        body = json.dumps(request).encode()
+        upstream_request = urllib.request.Request(
+            self.upstream, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(upstream_request, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def _make_handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                response = proxy.handle(json.loads(self.rfile.read(length)))
+                body = json.dumps(response).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON-RPC record/replay proxy')
+    parser.add_argument('mode', choices=[RECORD, REPLAY])
+    parser.add_argument('--cassette', required=True)
+    parser.add_argument('--upstream')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    proxy = CassetteProxy(args.cassette, args.mode, args.upstream, args.port).start()
+    print(f'Serving {args.mode} proxy on {proxy.url} (cassette {args.cassette})')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.stop()
+        print(proxy.stats.summary(args.mode))
+
+
+if __name__ == '__main__':
+    main()
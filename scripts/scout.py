@@ -7,6 +7,8 @@ sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from config import *
 from .utils import deviation_percent, toE18, formatE18
+from .fixed_point import E18
+from .lens import read_provider_state, deviation_from_desired_tick
 
 
 deployer = accounts[0]
@@ -26,20 +28,33 @@ swapper = TokensSwapper.deploy({'from': deployer})
 
 
 def print_stats():
-    diff_from_chainlink = deviation_percent(provider.getSpotPrice(), provider.getChainlinkBasedWstethPrice())
-    total_wsteth_in_pool = wsteth_token.balanceOf(POOL)
-    total_weth_in_pool = weth_token.balanceOf(POOL)
+    # all values are read at the same block to be consistent with each other
+    block = web3.eth.block_number
+    state = read_provider_state(provider, block_identifier=block)
+    spot_price = provider.getSpotPrice(block_identifier=block)
+    chainlink_based_price = provider.getChainlinkBasedWstethPrice(block_identifier=block)
+    diff_from_chainlink = deviation_percent(spot_price, chainlink_based_price)
+    total_wsteth_in_pool = wsteth_token.balanceOf(POOL, block_identifier=block)
+    total_weth_in_pool = weth_token.balanceOf(POOL, block_identifier=block)
 
     print(
-        f'Current state:\n'
+        f'Current state at block {block}:\n'
         f'  total wsteth / weth in pool = {formatE18(total_wsteth_in_pool)} / {formatE18(total_weth_in_pool)}\n'
-        f'  current pool tick = {provider.getCurrentPriceTick()}\n'
-        f'  current pool price = {formatE18(provider.getSpotPrice())}\n'
-        f'  chainlink-based wsteth price = {formatE18(provider.getChainlinkBasedWstethPrice())}\n'
+        f'  current pool tick = {state.tick}\n'
+        f'  desired tick = {state.desired_tick} (deviation {deviation_from_desired_tick(state)},'
+        f' max {state.max_tick_deviation})\n'
+        f'  pool active liquidity = {state.pool_liquidity}\n'
+        f'  current pool price = {formatE18(spot_price)}\n'
+        f'  chainlink-based wsteth price = {formatE18(chainlink_based_price)}\n'
         f'  abs deviation from chainlink price = {diff_from_chainlink:.2}%\n'
     )
 
-    # TODO: ? print some info about existing positions
+    if state.liquidity_position_token_id != 0:
+        print(
+            f'Liquidity position {state.liquidity_position_token_id}:\n'
+            f'  liquidity = {state.position_liquidity}\n'
+            f'  tokens owed wsteth / weth = {formatE18(state.position_tokens_owed0)} / {formatE18(state.position_tokens_owed1)}\n'
+        )
 
 
 def get_amounts_for_liquidity(liquidity):
@@ -54,13 +69,14 @@ def calc_token_amounts(eth_to_use):
     wsteth_example_amount, weth_example_amount = get_amounts_for_liquidity(toE18(50))
     # print((wsteth_example_amount, weth_example_amount))
 
-    wsteth_to_weth_ratio = wsteth_example_amount / weth_example_amount
+    wsteth_to_weth_ratio = E18.from_wei(wsteth_example_amount) / E18.from_wei(weth_example_amount)
     # print(wsteth_to_weth_ratio)
 
-    weth_amount = eth_to_use / (1 + wsteth_to_weth_ratio * wsteth_token.stEthPerToken() / 1e18)
+    steth_per_token = E18.from_wei(wsteth_token.stEthPerToken())
+    weth_amount = E18.from_wei(eth_to_use) / (E18(1) + wsteth_to_weth_ratio * steth_per_token)
     wsteth_amount = weth_amount * wsteth_to_weth_ratio
 
-    return wsteth_amount, weth_amount
+    return wsteth_amount.wei, weth_amount.wei
 
 
 def shift_spot_price(eth_amount):
@@ -91,14 +107,14 @@ def calc_seeding_params(eth_amount, liquidity):
 def print_amounts_calculated_by_pool():
     wsteth_amount, weth_amount = calc_token_amounts(ETH_TO_SEED - provider.ETH_AMOUNT_MARGIN())
 
-    eth_used = wsteth_amount * wsteth_token.stEthPerToken() / 1e18  + weth_amount
+    eth_used = E18.from_wei(wsteth_amount) * E18.from_wei(wsteth_token.stEthPerToken()) + E18.from_wei(weth_amount)
 
     pprint({
         'input eth': formatE18(ETH_TO_SEED),
         'wsteth_amount': formatE18(wsteth_amount),
         'weth_amount': formatE18(weth_amount),
-        'wsteth/weth ratio': wsteth_amount / weth_amount,
-        'eth_used (approx)': formatE18(eth_used),
+        'wsteth/weth ratio': E18.from_wei(wsteth_amount) / E18.from_wei(weth_amount),
+        'eth_used': formatE18(eth_used.wei),
     })
 
 
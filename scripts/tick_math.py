@@ -0,0 +1,140 @@
+"""Vectorized conversions between price, tick and sqrtPriceX96
+
+The tick is estimated with a float logarithm and then corrected against the
+exact tick boundaries (TickMath.getSqrtRatioAtTick), so the results are the
+ticks the pool itself would report. Boundaries are computed lazily for the
+window of ticks seen so far and cached.
+"""
+from math import log
+import numpy as np
+
+from .univ3_math import get_sqrt_ratio_at_tick, MIN_TICK, MAX_TICK, MIN_SQRT_RATIO, MAX_SQRT_RATIO, Q96
+
+
+LOG_1_0001 = log(1.0001)
+
+# prices of MIN_TICK and MAX_TICK, valid prices are in [MIN_PRICE, MAX_PRICE) as sqrtPriceX96 in the pool
+MIN_PRICE = (MIN_SQRT_RATIO * MIN_SQRT_RATIO) / (Q96 * Q96)
+MAX_PRICE = (MAX_SQRT_RATIO * MAX_SQRT_RATIO) / (Q96 * Q96)
+
+
+class TickBoundaries:
+    """Exact sqrt ratios of a contiguous window of ticks and their float images"""
+
+    def __init__(self):
+        self.lower = 0
+        self.upper = -1  # inclusive, empty window
+        self.sqrt_ratios = np.empty(0, dtype=object)
+        self.sqrt_ratios_float = np.empty(0, dtype=np.float64)
+        self.prices = np.empty(0, dtype=np.float64)
+
+    def ensure(self, lower, upper):
+        lower, upper = max(int(lower), MIN_TICK), min(int(upper), MAX_TICK)
+        if self.lower <= lower and upper <= self.upper:
+            return
+        if self.upper >= self.lower:
+            lower, upper = min(lower, self.lower), max(upper, self.upper)
+
+        sqrt_ratios = np.empty(upper - lower + 1, dtype=object)
+        sqrt_ratios[:] = [self._sqrt_ratio(tick) for tick in range(lower, upper + 1)]
+        self.sqrt_ratios = sqrt_ratios
+        # int -> float and int / int are correctly rounded in Python
+        self.sqrt_ratios_float = np.array([float(s) for s in sqrt_ratios], dtype=np.float64)
+        self.prices = np.array([(s * s) / (Q96 * Q96) for s in sqrt_ratios], dtype=np.float64)
+        self.lower, self.upper = lower, upper
+
+    def _sqrt_ratio(self, tick):
+        if self.lower <= tick <= self.upper:
+            return self.sqrt_ratios[tick - self.lower]
+        return get_sqrt_ratio_at_tick(tick)
+
+
+_boundaries = TickBoundaries()
+
+
+def _estimate_window(estimates):
+    # the log estimate is off by at most one tick, one more tick is needed for the upper check
+    _boundaries.ensure(estimates.min() - 1, estimates.max() + 2)
+    return _boundaries.lower
+
+
+def _check_ticks(ticks):
+    if ticks.min() < MIN_TICK or ticks.max() > MAX_TICK:
+        raise ValueError(f'ticks must be within [{MIN_TICK}, {MAX_TICK}]')
+
+
+def prices_to_ticks(prices):
+    """Greatest ticks whose boundary price is <= price (the boundary is rounded to float64)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.size == 0:
+        return np.empty(prices.shape, dtype=np.int64)
+    if not np.all(np.isfinite(prices)):
+        raise ValueError('prices must be finite')
+    if not np.all((prices >= MIN_PRICE) & (prices < MAX_PRICE)):
+        raise ValueError(f'prices must be within [{MIN_PRICE}, {MAX_PRICE}), the prices of the min and max ticks')
+
+    # the estimate of a price near the range edges may be a tick off beyond it
+    ticks = np.floor(np.log(prices) / LOG_1_0001).astype(np.int64)
+    ticks = np.clip(ticks, MIN_TICK, MAX_TICK - 1)
+    offset = _estimate_window(ticks)
+
+    ticks -= prices < _boundaries.prices[ticks - offset]
+    ticks += prices >= _boundaries.prices[ticks + 1 - offset]
+    return ticks
+
+
+def sqrt_prices_x96_to_ticks(sqrt_prices_x96):
+    """Exact TickMath.getTickAtSqrtRatio for arrays of (python int) sqrtPriceX96 values"""
+    sqrt_prices_x96 = np.asarray(sqrt_prices_x96, dtype=object)
+    if sqrt_prices_x96.size == 0:
+        return np.empty(sqrt_prices_x96.shape, dtype=np.int64)
+    if not all(MIN_SQRT_RATIO <= s < MAX_SQRT_RATIO for s in sqrt_prices_x96.flat):
+        raise ValueError(f'sqrt prices must be within [{MIN_SQRT_RATIO}, {MAX_SQRT_RATIO})')
+
+    sqrt_prices_float = sqrt_prices_x96.astype(np.float64)
+    ticks = np.floor(2 * np.log(sqrt_prices_float / Q96) / LOG_1_0001).astype(np.int64)
+    ticks = np.clip(ticks, MIN_TICK, MAX_TICK - 1)
+    offset = _estimate_window(ticks)
+
+    # Rounding to float is monotonic, so only equal float images need the exact int comparison
+    index = ticks - offset
+    boundaries_float = _boundaries.sqrt_ratios_float[index]
+    step_down = sqrt_prices_float < boundaries_float
+    ties = np.nonzero(sqrt_prices_float == boundaries_float)[0]
+    if ties.size:
+        step_down[ties] = (sqrt_prices_x96[ties] < _boundaries.sqrt_ratios[index[ties]]).astype(bool)
+    ticks -= step_down
+
+    index = ticks + 1 - offset
+    boundaries_float = _boundaries.sqrt_ratios_float[index]
+    step_up = sqrt_prices_float > boundaries_float
+    ties = np.nonzero(sqrt_prices_float == boundaries_float)[0]
+    if ties.size:
+        step_up[ties] = (sqrt_prices_x96[ties] >= _boundaries.sqrt_ratios[index[ties]]).astype(bool)
+    ticks += step_up
+
+    return ticks
+
+
+def ticks_to_sqrt_prices_x96(ticks):
+    """Exact TickMath.getSqrtRatioAtTick, returns an object array of python ints"""
+    ticks = np.asarray(ticks, dtype=np.int64)
+    if ticks.size == 0:
+        return np.empty(0, dtype=object)
+    _check_ticks(ticks)
+    _boundaries.ensure(ticks.min(), ticks.max())
+    return _boundaries.sqrt_ratios[ticks - _boundaries.lower]
+
+
+def ticks_to_prices(ticks):
+    """Prices at the lower boundaries of the ticks (token1 per token0, rounded to float64)"""
+    ticks = np.asarray(ticks, dtype=np.int64)
+    if ticks.size == 0:
+        return np.empty(0, dtype=np.float64)
+    _check_ticks(ticks)
+    _boundaries.ensure(ticks.min(), ticks.max())
+    return _boundaries.prices[ticks - _boundaries.lower]
+
+
+def sqrt_prices_x96_to_prices(sqrt_prices_x96):
+    return (np.asarray(sqrt_prices_x96, dtype=object).astype(np.float64) / Q96) ** 2
@@ -0,0 +1,228 @@
+"""Exact integer ports of the Uniswap V3 math used by UniV3LiquidityProvider
+
+Used as an independent off-chain reference for the contract calculations.
+The functions follow TickMath, SqrtPriceMath, FullMath and LiquidityAmounts
+of v3-core/v3-periphery, including their rounding.
+"""
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+
+Q96 = 1 << 96
+Q128 = 1 << 128
+MAX_UINT128 = (1 << 128) - 1
+MAX_UINT256 = (1 << 256) - 1
+
+# Values of UniV3LiquidityProvider constants
+POSITION_LOWER_TICK = -1630
+POSITION_UPPER_TICK = 970
+RATIO_LIQUIDITY = 20 * 10**18  # liquidity used in _calcDesiredTokensRatio
+WSTETH_DUMMY_AMOUNT = 300 * 10**18  # dummyAmount used in _calcDesiredTokenAmounts
+
+_TICK_MATH_FACTORS = (
+    (0x2, 0xfff97272373d413259a46990580e213a),
+    (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0),
+    (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0),
+    (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053),
+    (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54),
+    (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9),
+    (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5),
+    (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6),
+    (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604),
+    (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+
+def mul_div(a, b, denominator):
+    assert denominator > 0
+    result = a * b // denominator
+    assert result <= MAX_UINT256
+    return result
+
+
+def mul_div_rounding_up(a, b, denominator):
+    result = mul_div(a, b, denominator)
+    if (a * b) % denominator > 0:
+        result += 1
+    assert result <= MAX_UINT256
+    return result
+
+
+def div_rounding_up(a, b):
+    return a // b + (1 if a % b > 0 else 0)
+
+
+def to_uint128(x):
+    assert 0 <= x <= MAX_UINT128, 'uint128 overflow'
+    return x
+
+
+def get_sqrt_ratio_at_tick(tick):
+    abs_tick = abs(tick)
+    assert abs_tick <= MAX_TICK, 'T'
+
+    ratio = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else 0x100000000000000000000000000000000
+    for mask, factor in _TICK_MATH_FACTORS:
+        if abs_tick & mask:
+            ratio = (ratio * factor) >> 128
+
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+
+    return (ratio >> 32) + (0 if ratio % (1 << 32) == 0 else 1)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """Greatest tick whose sqrt ratio is <= sqrt_price_x96 (same as TickMath.getTickAtSqrtRatio)"""
+    assert MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO, 'R'
+
+    low, high = MIN_TICK, MAX_TICK
+    while low < high:
+        mid = (low + high + 1) // 2
+        if get_sqrt_ratio_at_tick(mid) <= sqrt_price_x96:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def get_amount0_delta(sqrt_ratio_a_x96, sqrt_ratio_b_x96, liquidity, round_up):
+    if sqrt_ratio_a_x96 > sqrt_ratio_b_x96:
+        sqrt_ratio_a_x96, sqrt_ratio_b_x96 = sqrt_ratio_b_x96, sqrt_ratio_a_x96
+
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_ratio_b_x96 - sqrt_ratio_a_x96
+    assert sqrt_ratio_a_x96 > 0
+
+    if round_up:
+        return div_rounding_up(
+            mul_div_rounding_up(numerator1, numerator2, sqrt_ratio_b_x96), sqrt_ratio_a_x96)
+    return mul_div(numerator1, numerator2, sqrt_ratio_b_x96) // sqrt_ratio_a_x96
+
+
+def get_amount1_delta(sqrt_ratio_a_x96, sqrt_ratio_b_x96, liquidity, round_up):
+    if sqrt_ratio_a_x96 > sqrt_ratio_b_x96:
+        sqrt_ratio_a_x96, sqrt_ratio_b_x96 = sqrt_ratio_b_x96, sqrt_ratio_a_x96
+
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_ratio_b_x96 - sqrt_ratio_a_x96, Q96)
+    return mul_div(liquidity, sqrt_ratio_b_x96 - sqrt_ratio_a_x96, Q96)
+
+
+def get_amount0_delta_signed(sqrt_ratio_a_x96, sqrt_ratio_b_x96, liquidity):
+    """SqrtPriceMath.getAmount0Delta overload taking int128 liquidity"""
+    if liquidity < 0:
+        return -get_amount0_delta(sqrt_ratio_a_x96, sqrt_ratio_b_x96, -liquidity, False)
+    return get_amount0_delta(sqrt_ratio_a_x96, sqrt_ratio_b_x96, liquidity, True)
+
+
+def get_amount1_delta_signed(sqrt_ratio_a_x96, sqrt_ratio_b_x96, liquidity):
+    """SqrtPriceMath.getAmount1Delta overload taking int128 liquidity"""
+    if liquidity < 0:
+        return -get_amount1_delta(sqrt_ratio_a_x96, sqrt_ratio_b_x96, -liquidity, False)
+    return get_amount1_delta(sqrt_ratio_a_x96, sqrt_ratio_b_x96, liquidity, True)
+
+
+def get_liquidity_for_amount0(sqrt_ratio_a_x96, sqrt_ratio_b_x96, amount0):
+    if sqrt_ratio_a_x96 > sqrt_ratio_b_x96:
+        sqrt_ratio_a_x96, sqrt_ratio_b_x96 = sqrt_ratio_b_x96, sqrt_ratio_a_x96
+    intermediate = mul_div(sqrt_ratio_a_x96, sqrt_ratio_b_x96, Q96)
+    return to_uint128(mul_div(amount0, intermediate, sqrt_ratio_b_x96 - sqrt_ratio_a_x96))
+
+
+def get_liquidity_for_amount1(sqrt_ratio_a_x96, sqrt_ratio_b_x96, amount1):
+    if sqrt_ratio_a_x96 > sqrt_ratio_b_x96:
+        sqrt_ratio_a_x96, sqrt_ratio_b_x96 = sqrt_ratio_b_x96, sqrt_ratio_a_x96
+    return to_uint128(mul_div(amount1, Q96, sqrt_ratio_b_x96 - sqrt_ratio_a_x96))
+
+
+def get_liquidity_for_amounts(sqrt_ratio_x96, sqrt_ratio_a_x96, sqrt_ratio_b_x96, amount0, amount1):
+    if sqrt_ratio_a_x96 > sqrt_ratio_b_x96:
+        sqrt_ratio_a_x96, sqrt_ratio_b_x96 = sqrt_ratio_b_x96, sqrt_ratio_a_x96
+
+    if sqrt_ratio_x96 <= sqrt_ratio_a_x96:
+        return get_liquidity_for_amount0(sqrt_ratio_a_x96, sqrt_ratio_b_x96, amount0)
+    if sqrt_ratio_x96 < sqrt_ratio_b_x96:
+        return min(
+            get_liquidity_for_amount0(sqrt_ratio_x96, sqrt_ratio_b_x96, amount0),
+            get_liquidity_for_amount1(sqrt_ratio_a_x96, sqrt_ratio_x96, amount1),
+        )
+    return get_liquidity_for_amount1(sqrt_ratio_a_x96, sqrt_ratio_b_x96, amount1)
+
+
+def calc_desired_tokens_ratio(tick, lower_tick=POSITION_LOWER_TICK, upper_tick=POSITION_UPPER_TICK):
+    """Same as UniV3LiquidityProvider._calcDesiredTokensRatio"""
+    sqrt_price_x96 = get_sqrt_ratio_at_tick(tick)
+    amount0 = get_amount0_delta_signed(
+        sqrt_price_x96, get_sqrt_ratio_at_tick(upper_tick), RATIO_LIQUIDITY)
+    amount1 = get_amount1_delta_signed(
+        get_sqrt_ratio_at_tick(lower_tick), sqrt_price_x96, RATIO_LIQUIDITY)
+    assert amount0 > 0
+    assert amount1 > 0
+    return (amount0 * 10**18) // amount1
+
+
+def calc_token_amounts_for_ratio(ratio, eth_amount, steth_by_dummy_wsteth):
+    """Split eth_amount into (wsteth, weth) amounts for the given desired tokens ratio
+
+    @param steth_by_dummy_wsteth wstETH.getStETHByWstETH(WSTETH_DUMMY_AMOUNT)
+    """
+    denom = 10**18 + (ratio * steth_by_dummy_wsteth) // WSTETH_DUMMY_AMOUNT
+    amount1 = (eth_amount * 10**18) // denom
+    amount0 = (amount1 * ratio) // 10**18
+    return amount0, amount1
+
+
+def calc_desired_token_amounts(tick, eth_amount, steth_by_dummy_wsteth,
+                               lower_tick=POSITION_LOWER_TICK, upper_tick=POSITION_UPPER_TICK):
+    """Same as UniV3LiquidityProvider._calcDesiredTokenAmounts"""
+    ratio = calc_desired_tokens_ratio(tick, lower_tick, upper_tick)
+    return calc_token_amounts_for_ratio(ratio, eth_amount, steth_by_dummy_wsteth)
+
+
+def get_fee_growth_inside(tick_current, tick_lower, tick_upper,
+                          lower_fee_growth_outside_x128, upper_fee_growth_outside_x128, fee_growth_global_x128):
+    """Tick.getFeeGrowthInside for a single token (all arithmetic is modulo 2**256 as in the pool)"""
+    if tick_current >= tick_lower:
+        fee_growth_below = lower_fee_growth_outside_x128
+    else:
+        fee_growth_below = (fee_growth_global_x128 - lower_fee_growth_outside_x128) % (MAX_UINT256 + 1)
+
+    if tick_current < tick_upper:
+        fee_growth_above = upper_fee_growth_outside_x128
+    else:
+        fee_growth_above = (fee_growth_global_x128 - upper_fee_growth_outside_x128) % (MAX_UINT256 + 1)
+
+    return (fee_growth_global_x128 - fee_growth_below - fee_growth_above) % (MAX_UINT256 + 1)
+
+
+def get_amounts_for_burn(sqrt_price_x96, tick_current, tick_lower, tick_upper, liquidity):
+    """Token amounts UniswapV3Pool.burn() owes for removing `liquidity` from the range"""
+    sqrt_ratio_lower_x96 = get_sqrt_ratio_at_tick(tick_lower)
+    sqrt_ratio_upper_x96 = get_sqrt_ratio_at_tick(tick_upper)
+
+    if tick_current < tick_lower:
+        return get_amount0_delta(sqrt_ratio_lower_x96, sqrt_ratio_upper_x96, liquidity, False), 0
+    if tick_current < tick_upper:
+        return (
+            get_amount0_delta(sqrt_price_x96, sqrt_ratio_upper_x96, liquidity, False),
+            get_amount1_delta(sqrt_ratio_lower_x96, sqrt_price_x96, liquidity, False),
+        )
+    return 0, get_amount1_delta(sqrt_ratio_lower_x96, sqrt_ratio_upper_x96, liquidity, False)
+
+
+def get_fees_owed(fee_growth_inside_x128, fee_growth_inside_last_x128, liquidity):
+    """Fees accrued by a position since its last update (as NonfungiblePositionManager computes them)"""
+    fee_growth_delta = (fee_growth_inside_x128 - fee_growth_inside_last_x128) % (MAX_UINT256 + 1)
+    return mul_div(fee_growth_delta, liquidity, Q128) % (MAX_UINT128 + 1)
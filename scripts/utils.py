@@ -3,16 +3,18 @@ from math import floor, sqrt, log
 from pprint import pprint
 import os
 
+from .fixed_point import E18
+from .tick_math import prices_to_ticks
+
 
 def toE18(x):
-    return round(x * 1e18)
+    return E18(x).wei
 
 def fromE18(x):
     return x / 1e18
 
 def formatE18(num):
-    floating_num = num / 1e18
-    return f'{floating_num:.4f} ({floor(num)})'
+    return f'{E18.from_wei(int(num)):.4f} ({floor(num)})'
 
 def get_balance(address):
     return Contract.from_abi("Foo", address, "").balance()
@@ -21,7 +23,7 @@ def deviation_percent(value, base):
     return 100 * abs((value - base) / base)
 
 def get_tick_from_price(price):
-    return floor(log(sqrt(price), sqrt(1.0001)))
+    return int(prices_to_ticks([price])[0])
 
 def get_tick_positions_liquidity(pool, tick):
     (liquidity_gross, _, _, _, _, _, _, _) = pool.ticks(tick)
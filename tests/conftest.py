@@ -1,11 +1,202 @@
 import pytest
-from brownie import ZERO_ADDRESS, Contract
+from brownie import ZERO_ADDRESS, Contract, chain
 
 import sys
 import os.path
+import inspect
+import hashlib
+import time
+from types import SimpleNamespace
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from config import *
+from scripts.rpc_cassette import CassetteProxy, DEFAULT_PORT, RECORD, REPLAY
+from scripts.pool_state import set_pool_price
+
+
+_cassette_proxy = None
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'scenario(name): run the test on top of the named cached setup')
+    _configure_cassette()
+
+
+def _configure_cassette():
+    """Serve the mainnet fork through a record/replay proxy if RPC_CASSETTE is set
+
+    RPC_CASSETTE - path to the cassette file
+    RPC_CASSETTE_MODE - 'record' or 'replay' (default: replay if the cassette exists)
+    RPC_CASSETTE_UPSTREAM - upstream node url, required for recording
+    RPC_CASSETTE_PORT - local port of the proxy (default: 8546)
+    """
+    global _cassette_proxy
+    cassette_path = os.environ.get('RPC_CASSETTE')
+    if not cassette_path:
+        return
+
+    mode = os.environ.get('RPC_CASSETTE_MODE') or (REPLAY if os.path.exists(cassette_path) else RECORD)
+    port = int(os.environ.get('RPC_CASSETTE_PORT', DEFAULT_PORT))
+    _cassette_proxy = CassetteProxy(
+        cassette_path, mode, os.environ.get('RPC_CASSETTE_UPSTREAM'), port).start()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_finish(session):
+    """Redirects the fork to the cassette proxy
+
+    By now brownie's plugin has loaded the project config (in its
+    pytest_configure), and it connects to the network only after this hook
+    returns, so the override is neither overwritten nor applied too late.
+    """
+    if _cassette_proxy is None:
+        return
+
+    from brownie import network
+    from brownie._config import CONFIG
+    if network.is_connected():
+        raise pytest.UsageError('RPC_CASSETTE is set, but brownie has already connected to the network')
+
+    fork = CONFIG.networks['development']['cmd_settings'].get('fork', '')
+    fork_block = fork.rsplit('@', 1)[1] if '@' in fork else None
+    CONFIG.networks['development']['cmd_settings']['fork'] = \
+        _cassette_proxy.url if fork_block is None else f'{_cassette_proxy.url}@{fork_block}'
+
+
+def pytest_unconfigure(config):
+    if _cassette_proxy is not None:
+        _cassette_proxy.stop()
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _cassette_proxy is not None:
+        terminalreporter.write_sep('=', 'rpc cassette')
+        terminalreporter.write_line(_cassette_proxy.stats.summary(_cassette_proxy.mode))
+    if _scenario_cache.stats:
+        terminalreporter.write_sep('=', 'scenarios')
+        for line in _scenario_cache.summary():
+            terminalreporter.write_line(line)
+
+
+SCENARIOS = {}
+
+
+def scenario_builder(name):
+    """Registers a setup shared by the tests marked with @pytest.mark.scenario(name)
+
+    The builder takes fixtures as arguments and returns a dict, available to the
+    tests as attributes of the `scenario` fixture.
+    """
+    def register(build):
+        SCENARIOS[name] = build
+        return build
+    return register
+
+
+class ScenarioCache:
+    """Keeps the chain at the state of the active scenario while its tests run
+
+    Tests are grouped by scenario, the first test of a group builds it and
+    snapshots the chain so that fn_isolation reverts to the scenario state
+    after each test. Every test reverts its changes and scenario groups run
+    after the other tests of the module, so the state before a build is the
+    module start state: when the group ends the chain is reset to it.
+    module_isolation resets the chain between modules as well, so a scenario
+    is built once per module.
+    """
+
+    def __init__(self):
+        self.active = None  # (key, module, state)
+        self.stats = {}
+
+    def get(self, name, request):
+        build = SCENARIOS[name]
+        args = {arg: request.getfixturevalue(arg) for arg in inspect.signature(build).parameters}
+        key = (name, self._bytecode_hash(args.values()))
+        stats = self.stats.setdefault(name, {'builds': 0, 'failures': 0, 'reuses': 0, 'build_seconds': 0.0})
+
+        if self.active is not None and self.active[0] == key and self.active[1] == request.module:
+            stats['reuses'] += 1
+            return self._rebind(self.active[2])
+
+        self.leave()
+        chain.snapshot()
+        started = time.perf_counter()
+        try:
+            state = build(**args)
+        except Exception:
+            stats['failures'] += 1
+            chain.revert()
+            raise
+        stats['build_seconds'] += time.perf_counter() - started
+        stats['builds'] += 1
+        chain.snapshot()
+        self.active = (key, request.module, state)
+        return SimpleNamespace(**state)
+
+    def leave(self, module=None):
+        """Resets the chain to the state before the active scenario (skipped if the module was reset)"""
+        if self.active is None:
+            return
+        _, active_module, _ = self.active
+        self.active = None
+        if module is None or module == active_module:
+            chain.reset()
+
+    def summary(self):
+        for name, stats in self.stats.items():
+            if stats['builds'] == 0:
+                yield f'{name}: failed to build {stats["failures"]}x'
+                continue
+            build_seconds = stats['build_seconds'] / stats['builds']
+            yield (
+                f'{name}: built {stats["builds"]}x in {build_seconds:.2f}s, reused {stats["reuses"]}x, '
+                f'saved ~{build_seconds * stats["reuses"]:.2f}s'
+                + (f', failed to build {stats["failures"]}x' if stats['failures'] else '')
+            )
+
+    @staticmethod
+    def _bytecode_hash(args):
+        bytecodes = sorted(arg.bytecode for arg in args if isinstance(getattr(arg, 'bytecode', None), str))
+        return hashlib.sha256(''.join(bytecodes).encode()).hexdigest()
+
+    @staticmethod
+    def _rebind(state):
+        return SimpleNamespace(**{
+            name: Contract.from_abi(value._name, value.address, value.abi) if hasattr(value, 'abi') else value
+            for name, value in state.items()
+        })
+
+
+_scenario_cache = ScenarioCache()
+
+
+def _scenario_name(item):
+    marker = item.get_closest_marker('scenario')
+    return marker.args[0] if marker is not None else None
+
+
+def pytest_collection_modifyitems(items):
+    # run the tests of a scenario one after another, tests without scenarios go first
+    modules = []
+    for item in items:
+        if item.module not in modules:
+            modules.append(item.module)
+    items.sort(key=lambda item: (modules.index(item.module), _scenario_name(item) or ''))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    active = _scenario_cache.active
+    if active is not None and (_scenario_name(item) != active[0][0] or item.module != active[1]):
+        _scenario_cache.leave(item.module)
+
+
+@pytest.fixture(scope='function')
+def scenario(request):
+    name = _scenario_name(request.node)
+    assert name is not None, 'mark the test with @pytest.mark.scenario(name)'
+    return _scenario_cache.get(name, request)
 
 
 @pytest.fixture(scope='function', autouse=True)
@@ -40,8 +231,7 @@ def position_manager(interface):
 def lido_agent():
     return Contract.from_abi("Foo", LIDO_AGENT, "")
 
-@pytest.fixture(scope='function')
-def provider(deployer, TestUniV3LiquidityProvider):
+def deploy_test_provider(deployer, TestUniV3LiquidityProvider):
     return TestUniV3LiquidityProvider.deploy(
         ETH_TO_SEED,
         INITIAL_DESIRED_TICK,
@@ -49,6 +239,17 @@ def provider(deployer, TestUniV3LiquidityProvider):
         MAX_ALLOWED_DESIRED_TICK_CHANGE,
         {'from': deployer})
 
+@pytest.fixture(scope='function')
+def provider(deployer, TestUniV3LiquidityProvider):
+    return deploy_test_provider(deployer, TestUniV3LiquidityProvider)
+
+# moves the pool price by writing its storage instead of swapping, reverted by fn_isolation
+@pytest.fixture(scope='module')
+def set_pool_tick(pool):
+    def set_tick(tick):
+        return set_pool_price(pool, tick=tick)
+    return set_tick
+
 # making scope 'module' causes "This contract no longer exists" errors
 @pytest.fixture(scope='function')
 def swapper(deployer, TokensSwapper):
@@ -60,6 +261,33 @@ def nft_mock(deployer, ERC721Mock):
     return ERC721Mock.deploy({'from': deployer})
 
 
+@scenario_builder('funded_provider')
+def build_funded_provider(deployer, TestUniV3LiquidityProvider):
+    provider = deploy_test_provider(deployer, TestUniV3LiquidityProvider)
+    deployer.transfer(provider.address, ETH_TO_SEED)
+    return {'provider': provider}
+
+@scenario_builder('position_owned_by_provider')
+def build_position_owned_by_provider(deployer, TestUniV3LiquidityProvider, position_manager, steth_token, lido_agent):
+    state = build_funded_provider(deployer, TestUniV3LiquidityProvider)
+    provider = state['provider']
+    agent_steth_before = steth_token.balanceOf(LIDO_AGENT)
+    agent_eth_before = lido_agent.balance()
+
+    token_id, liquidity, wsteth_provided, weth_provided = provider.mint(provider.desiredTick()).return_value
+    assert position_manager.ownerOf(token_id) == LIDO_AGENT
+    position_manager.transferFrom(LIDO_AGENT, provider, token_id, {'from': LIDO_AGENT})
+    return dict(
+        state,
+        token_id=token_id,
+        liquidity=liquidity,
+        wsteth_provided=wsteth_provided,
+        weth_provided=weth_provided,
+        agent_steth_before=agent_steth_before,
+        agent_eth_before=agent_eth_before,
+    )
+
+
 class Helpers:
     @staticmethod
     def filter_events_from(addr, events):
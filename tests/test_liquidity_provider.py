@@ -1,15 +1,38 @@
 from contextlib import AsyncExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pprint import pprint
+from decimal import Decimal
 from eth_account import Account
 import pytest
 from brownie import Contract, accounts, ZERO_ADDRESS, chain, reverts, ETH_ADDRESS
+from brownie.test import given, strategy
+from hypothesis import settings, HealthCheck
 
+import asyncio
+import json
+import threading
+import urllib.request
 import sys
 import os.path
 
 from scripts.utils import *
+from scripts.fixed_point import E18
+from scripts import univ3_math
+from scripts.tick_math import prices_to_ticks, sqrt_prices_x96_to_ticks, ticks_to_prices, ticks_to_sqrt_prices_x96
+from scripts.lens import get_lens, read_provider_state, read_provider_state_deployless
+from scripts.preview import preview_close
+from scripts.ratio_table import RatioTable
+from scripts.pool_state import set_pool_price
+from scripts.pools import discover_pools, get_initialized_ticks, read_pool_snapshots, size_position
+from scripts import fast_call
+from scripts.mint_trigger import MintTrigger
+from scripts.close_bounds import get_band_sqrt_prices, quote_close
+from scripts.pool_history import PoolHistoryStore, ingest, limbs_to_ints
+from scripts.pipeline import TxPipeline, legacy_gas_price
+from scripts.rpc_cassette import CassetteProxy, RECORD, REPLAY
 import scripts.deploy
 import scripts.mint
+import scripts.deploy_and_mint
 
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
@@ -51,11 +74,31 @@ class assert_leftovers_refunded():
                 == self.eth_leftover + self.weth_leftover
 
             assert deviation_percent(
-                self.steth_token.balanceOf(self.lido_agent.address) - self.agent_steth_before,
-                self.wsteth_leftover * self.wsteth_token.stEthPerToken() / 1e18
+                E18.from_wei(self.steth_token.balanceOf(self.lido_agent.address) - self.agent_steth_before),
+                E18.from_wei(self.wsteth_leftover) * E18.from_wei(self.wsteth_token.stEthPerToken())
             ) < 0.001  # 0.001%
 
 
+def gas_used_by_each_implementation(deployer, implementations, run):
+    """Results of `run(provider)` for a fresh provider of each implementation, all run from the same chain state
+
+    Must be called before the test changes the chain: fn_isolation reverts to the snapshot taken here.
+    """
+    results = []
+    chain.snapshot()
+    for i, implementation in enumerate(implementations):
+        if i > 0:
+            chain.revert()
+        provider = implementation.deploy(
+            ETH_TO_SEED,
+            INITIAL_DESIRED_TICK,
+            MAX_TICK_DEVIATION,
+            MAX_ALLOWED_DESIRED_TICK_CHANGE,
+            {'from': deployer})
+        results.append(run(provider))
+    return results
+
+
 def assert_contract_params_after_deployment(provider):
     assert POOL == provider.POOL()
     assert WSTETH_TOKEN == provider.TOKEN0()
@@ -90,12 +133,75 @@ def test_deploy_script_and_mint_script(deployer, UniV3LiquidityProvider, pool, p
     assert_contract_params_after_deployment(provider)
 
     deployer.transfer(provider.address, ETH_TO_SEED)
+    deployer_nonce = deployer.nonce
     tx = scripts.mint.main(deployer, skip_confirmation=True)
+    assert deployer.nonce == deployer_nonce + 1  # only the mint, no lens deployment
     token_id, _, _, _ = tx.return_value
 
     assert_liquidity_provided(provider, pool, position_manager, token_id)
 
 
+def test_deploy_and_mint_pipeline(deployer, pool, position_manager):
+    provider, steps = scripts.deploy_and_mint.main(deployer, skip_confirmation=True)
+
+    assert [step.name for step in steps] == ['deploy', 'fund', 'mint']
+    assert [step.nonce for step in steps] == [steps[0].nonce + i for i in range(3)]
+    assert all(step.latency is not None for step in steps)
+    assert read_deploy_address() == provider.address
+
+    assert_contract_params_after_deployment(provider)
+    assert provider.desiredTick() == MINT_DESIRED_TICK
+    assert_liquidity_provided(provider, pool, position_manager, provider.liquidityPositionTokenId())
+
+
+def test_deploy_and_mint_fund_and_mint_sent_after_deploy(deployer):
+    provider, steps = scripts.deploy_and_mint.main(deployer, skip_confirmation=True)
+    deploy, fund, mint = steps
+
+    assert deploy.receipt['status'] == 1
+    assert fund.receipt['blockNumber'] > deploy.receipt['blockNumber']
+    assert deploy.receipt['gasUsed'] <= scripts.deploy_and_mint.estimate_deploy_gas(
+        deployer, scripts.deploy_and_mint.get_deploy_init_code())
+
+
+def test_pipeline_resets_nonce_after_failed_send(deployer):
+    pipeline = TxPipeline(deployer, legacy_gas_price())
+    nonce = deployer.nonce
+
+    with pytest.raises(Exception):
+        asyncio.run(pipeline.submit('overspend', {'to': str(deployer), 'value': deployer.balance() + 1, 'gas': 21000}))
+
+    assert pipeline.nonces.peek() == nonce
+
+
+def test_e18_arithmetic_is_exact():
+    assert toE18(1.060505) == 1060505000000000000
+    assert toE18('600.000000000000000001') == toE18(600) + 1
+    assert E18.from_wei(toE18(0.1)) * 3 == E18('0.3')
+    assert fromE18(toE18(1.5)) == 1.5
+    assert E18(600) / E18(7) * E18(7) == E18('599.999999999999999995')
+    assert formatE18(toE18(600) - 500) == '600.0000 (599999999999999999500)'
+    with pytest.raises(TypeError):
+        E18(1) + 1
+
+
+def test_e18_comparisons_and_hashing_are_consistent():
+    assert not E18(1) == 1 and E18(1) != 1 and 1 != E18(1)
+    assert E18(1) not in [1, 2]
+    assert {1: 'int'}.get(E18(1)) is None and E18(1) not in {1, 2}
+    with pytest.raises(TypeError):
+        E18(1) < 1
+    with pytest.raises(TypeError):
+        1 >= E18(1)
+    assert E18(0) == 0
+    assert E18(1) == 1.0 and hash(E18(1)) == hash(1.0)
+    assert E18('1.5') == 1.5 and hash(E18('1.5')) == hash(1.5)
+    assert E18('0.1') == Decimal('0.1') and hash(E18('0.1')) == hash(Decimal('0.1'))
+    assert E18(0.1) != 0.1  # the float is not exactly 0.1
+    assert E18(0.1) < 0.1
+    assert len({E18(1), E18('1.0'), 1.0}) == 1
+
+
 def test_get_tick_from_price():
     # The price and tick values are taken from POOL.slot0() at various times
     assert get_tick_from_price(1.060857781063038396) == 590
@@ -103,6 +209,37 @@ def test_get_tick_from_price():
     assert get_tick_from_price(1.062379526319580873) == 605
 
 
+def test_tick_conversions_are_exact_at_boundaries(provider, pool):
+    ticks = list(range(-3000, 3000, 7))
+    sqrt_ratios = list(provider.getSqrtRatioAtTickBatch(ticks))
+
+    assert list(ticks_to_sqrt_prices_x96(ticks)) == sqrt_ratios
+    assert list(sqrt_prices_x96_to_ticks(sqrt_ratios)) == ticks
+    assert list(sqrt_prices_x96_to_ticks([s - 1 for s in sqrt_ratios])) == [t - 1 for t in ticks]
+    assert list(prices_to_ticks(ticks_to_prices(ticks))) == ticks
+
+    sqrt_price_x96, tick, _, _, _, _, _ = pool.slot0()
+    assert sqrt_prices_x96_to_ticks([sqrt_price_x96])[0] == tick
+
+
+def test_tick_conversions_reject_out_of_range_values():
+    for prices in ([float('nan')], [float('inf')], [0.0], [-1.0], [1.0, 1e39]):
+        with pytest.raises(ValueError):
+            prices_to_ticks(prices)
+    for sqrt_prices_x96 in ([univ3_math.MIN_SQRT_RATIO - 1], [univ3_math.MAX_SQRT_RATIO]):
+        with pytest.raises(ValueError):
+            sqrt_prices_x96_to_ticks(sqrt_prices_x96)
+    for ticks in ([univ3_math.MIN_TICK - 1], [0, univ3_math.MAX_TICK + 1]):
+        with pytest.raises(ValueError):
+            ticks_to_prices(ticks)
+        with pytest.raises(ValueError):
+            ticks_to_sqrt_prices_x96(ticks)
+
+    edge_ticks = [univ3_math.MIN_TICK, univ3_math.MAX_TICK - 1]
+    assert list(prices_to_ticks(ticks_to_prices(edge_ticks))) == edge_ticks
+    assert list(sqrt_prices_x96_to_ticks(ticks_to_sqrt_prices_x96(edge_ticks))) == edge_ticks
+
+
 def test_calc_tokens_ratio(provider):
     def calcRatio(tick):
         ratio = provider.calcDesiredTokensRatio(tick)
@@ -320,6 +457,7 @@ def test_mint_happy_path(deployer, provider, pool, position_manager, steth_token
                                    weth_token, lido_agent, need_check_agent_balance=False):
         tx = provider.mint(provider.desiredTick())
         print_mint_return_value(tx.return_value)
+        print(f'mint gas used: {tx.gas_used}')
         token_id, liquidity, amount0, amount1 = tx.return_value
 
         helpers.assert_single_event_named('LiquidityParametersUpdated', tx)
@@ -454,6 +592,90 @@ def test_mint_fails_if_large_tick_deviation(deployer, provider, swapper):
         provider.mint(provider.desiredTick())
 
 
+def test_set_pool_tick_keeps_pool_state_consistent(pool, set_pool_tick):
+    sqrt_price_before, tick_before = pool.slot0()[:2]
+    liquidity_before = pool.liquidity()
+    crossed_ticks = get_initialized_ticks(pool, tick_before - 1000, tick_before + 1000)
+    ticks_before = [pool.ticks(tick) for tick in crossed_ticks]
+
+    assert set_pool_tick(tick_before + 1000) == (univ3_math.get_sqrt_ratio_at_tick(tick_before + 1000), tick_before + 1000)
+    assert set_pool_tick(tick_before - 1000)[1] == tick_before - 1000
+
+    # crossing a tick twice restores its outside accumulators
+    set_pool_tick(tick_before)
+    assert pool.liquidity() == liquidity_before
+    assert [pool.ticks(tick)[:4] for tick in crossed_ticks] == [info[:4] for info in ticks_before]
+    set_pool_price(pool, sqrt_price_x96=sqrt_price_before)
+    assert pool.slot0()[:2] == (sqrt_price_before, tick_before)
+
+
+@pytest.mark.scenario('funded_provider')
+@pytest.mark.parametrize('sign', [1, -1])
+def test_mint_tick_deviation_bounds(scenario, set_pool_tick, sign):
+    provider = scenario.provider
+    max_deviation = provider.MAX_TICK_DEVIATION()
+
+    set_pool_tick(provider.desiredTick() + sign * (max_deviation + 1))
+    assert provider.deviationFromDesiredTick() == max_deviation + 1
+    with reverts('TICK_DEVIATION_TOO_BIG_AT_START'):
+        provider.mint(provider.desiredTick())
+
+    set_pool_tick(provider.desiredTick() + sign * max_deviation)
+    assert provider.deviationFromDesiredTick() == max_deviation
+
+
+# With desired tick 627 the min amounts are met for pool ticks of about 620..670 only
+# (see test_mint_succeeds_if_small_negative_tick_deviation), so at the deviation band
+# edges the deviation check passes but the position manager slippage check doesn't
+@pytest.mark.scenario('funded_provider')
+@pytest.mark.parametrize('sign', [1, -1])
+def test_mint_fails_slippage_check_at_max_tick_deviation(scenario, set_pool_tick, sign):
+    provider = scenario.provider
+    set_pool_tick(provider.desiredTick() + sign * provider.MAX_TICK_DEVIATION())
+
+    with reverts('Price slippage check'):
+        provider.mint(provider.desiredTick())
+
+
+@pytest.mark.scenario('funded_provider')
+@pytest.mark.parametrize('offset', [-5, 30])
+def test_mint_within_slippage_range(scenario, pool, position_manager, set_pool_tick, offset):
+    provider = scenario.provider
+    set_pool_tick(provider.desiredTick() + offset)
+
+    token_id, _, _, _ = provider.mint(provider.desiredTick()).return_value
+    assert_liquidity_provided(provider, pool, position_manager, token_id)
+
+
+@pytest.mark.scenario('funded_provider')
+def test_mint_at_exactly_desired_tick(scenario, pool, position_manager, set_pool_tick):
+    provider = scenario.provider
+    set_pool_tick(provider.desiredTick())
+
+    token_id, _, _, _ = provider.mint(provider.desiredTick()).return_value
+    assert_liquidity_provided(provider, pool, position_manager, token_id)
+
+
+@pytest.mark.scenario('position_owned_by_provider')
+def test_close_liquidity_position_at_position_range_edges(scenario, set_pool_tick):
+    provider = scenario.provider
+
+    # at the upper tick the position is all in WETH
+    set_pool_tick(provider.POSITION_UPPER_TICK())
+    with reverts('AMOUNT0_IS_ZERO'):
+        provider.closeLiquidityPosition()
+
+    # at the lower tick the position is all in wstETH
+    set_pool_tick(provider.POSITION_LOWER_TICK() - 1)
+    with reverts('AMOUNT1_IS_ZERO'):
+        provider.closeLiquidityPosition()
+
+    set_pool_tick(provider.POSITION_UPPER_TICK() - 1)
+    wsteth_returned, weth_returned, _, _ = provider.closeLiquidityPosition().return_value
+    assert wsteth_returned > 0
+    assert weth_returned > 0
+
+
 def test_attempt_to_change_desired_tick_too_much(provider):
     with reverts('DESIRED_TICK_IS_OUT_OF_ALLOWED_RANGE'):
         provider.mint(provider.MIN_ALLOWED_DESIRED_TICK() - 1)
@@ -511,6 +733,71 @@ def test_tickMath_sqrtPriceRatioAtTick(deployer, provider, swapper):
     assert deviation_percent(provider.getCurrentSqrtPriceX96(), provider.getSqrtRatioAtTick(tick)) < 0.003
 
 
+# Amount of points cross-checked by a single call of a batch helper
+BATCH_SIZE = 1000
+
+
+def split_to_batches(values, size=BATCH_SIZE):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def test_calc_tokens_ratio_batch_matches_reference(provider):
+    assert provider.POSITION_LOWER_TICK() == univ3_math.POSITION_LOWER_TICK
+    assert provider.POSITION_UPPER_TICK() == univ3_math.POSITION_UPPER_TICK
+
+    ticks = list(range(provider.POSITION_LOWER_TICK() + 1, provider.POSITION_UPPER_TICK()))
+
+    for batch in split_to_batches(ticks):
+        assert list(provider.calcDesiredTokensRatioBatch(batch)) \
+            == [univ3_math.calc_desired_tokens_ratio(tick) for tick in batch]
+
+
+@given(ticks=strategy('int24[]', min_value=univ3_math.MIN_TICK, max_value=univ3_math.MAX_TICK,
+                      min_length=1, max_length=BATCH_SIZE))
+@settings(suppress_health_check=[HealthCheck.function_scoped_fixture])
+def test_sqrt_ratio_at_tick_batch_matches_reference(provider, ticks):
+    assert list(provider.getSqrtRatioAtTickBatch(ticks)) \
+        == [univ3_math.get_sqrt_ratio_at_tick(tick) for tick in ticks]
+
+
+@given(
+    ticks=strategy('int24[]', min_value=univ3_math.POSITION_LOWER_TICK + 1,
+                   max_value=univ3_math.POSITION_UPPER_TICK - 1, min_length=1, max_length=BATCH_SIZE),
+    eth_amounts=strategy('uint256[]', max_value=toE18(1000000), min_length=1, max_length=BATCH_SIZE),
+)
+@settings(suppress_health_check=[HealthCheck.function_scoped_fixture])
+def test_calc_token_amounts_batch_matches_reference(provider, wsteth_token, ticks, eth_amounts):
+    size = min(len(ticks), len(eth_amounts))
+    ticks, eth_amounts = ticks[:size], eth_amounts[:size]
+    steth_by_dummy_wsteth = wsteth_token.getStETHByWstETH(univ3_math.WSTETH_DUMMY_AMOUNT)
+
+    amounts0, amounts1 = provider.calcDesiredTokenAmountsBatch(ticks, eth_amounts)
+
+    expected = [
+        univ3_math.calc_desired_token_amounts(tick, eth, steth_by_dummy_wsteth)
+        for tick, eth in zip(ticks, eth_amounts)
+    ]
+    assert list(zip(amounts0, amounts1)) == expected
+
+
+@given(
+    amounts0=strategy('uint256[]', max_value=toE18(1000000), min_length=1, max_length=BATCH_SIZE),
+    amounts1=strategy('uint256[]', max_value=toE18(1000000), min_length=1, max_length=BATCH_SIZE),
+)
+@settings(suppress_health_check=[HealthCheck.function_scoped_fixture])
+def test_liquidity_for_amounts_batch_matches_reference(provider, pool, amounts0, amounts1):
+    size = min(len(amounts0), len(amounts1))
+    amounts0, amounts1 = amounts0[:size], amounts1[:size]
+    sqrt_price_x96 = pool.slot0()[0]
+    sqrt_ratio_a_x96 = univ3_math.get_sqrt_ratio_at_tick(univ3_math.POSITION_LOWER_TICK)
+    sqrt_ratio_b_x96 = univ3_math.get_sqrt_ratio_at_tick(univ3_math.POSITION_UPPER_TICK)
+
+    assert list(provider.getLiquidityForAmountsBatch(amounts0, amounts1)) == [
+        univ3_math.get_liquidity_for_amounts(sqrt_price_x96, sqrt_ratio_a_x96, sqrt_ratio_b_x96, amount0, amount1)
+        for amount0, amount1 in zip(amounts0, amounts1)
+    ]
+
+
 # def test_compare_with_calc_token_amounts_by_pool(deployer, provider):
 #     deployer.transfer(provider.address, toE18(100))
 #     liquidity = toE18(30)
@@ -553,6 +840,85 @@ def test_calculated_desired_token_amounts(provider):
            <= provider.ethAmount()
 
 
+@pytest.mark.parametrize('wsteth_leftover,weth_leftover,eth_leftover,calls_skipped', [
+    (0, 0, 500, True),  # mint(): only ETH_AMOUNT_MARGIN is left
+    (0, toE18(0.01), 500, True),  # mint(): WETH is not used in full
+    (toE18(80), toE18(510), 0, False),  # closeLiquidityPosition(): both tokens are collected, nothing to skip
+])
+def test_refund_leftovers_gas(deployer, TestUniV3LiquidityProvider, TestUniV3LiquidityProviderBaseline,
+                              steth_token, wsteth_token, weth_token, lido_agent,
+                              wsteth_leftover, weth_leftover, eth_leftover, calls_skipped):
+    def refund(provider):
+        if wsteth_leftover > 0:
+            deployer.transfer(wsteth_token.address, provider.getAmountOfEthForWsteth(wsteth_leftover))
+            wsteth_token.transfer(provider.address, wsteth_leftover, {'from': deployer})
+        if weth_leftover > 0:
+            weth_token.deposit({'from': deployer, 'value': weth_leftover})
+            weth_token.transfer(provider.address, weth_leftover, {'from': deployer})
+        if eth_leftover > 0:
+            deployer.transfer(provider.address, eth_leftover)
+
+        with assert_leftovers_refunded(provider, steth_token, wsteth_token, weth_token, lido_agent,
+                                       need_check_agent_balance=wsteth_leftover > 0):
+            tx = provider.refundLeftoversToLidoAgent()
+        refunded_events = [dict(e) for e in tx.events['ERC20Refunded']] if 'ERC20Refunded' in tx.events else []
+        return tx.gas_used, lido_agent.balance(), steth_token.balanceOf(LIDO_AGENT), refunded_events
+
+    (baseline_gas, *baseline_result), (gas, *result) = gas_used_by_each_implementation(
+        deployer, [TestUniV3LiquidityProviderBaseline, TestUniV3LiquidityProvider], refund)
+
+    print(f'refund gas used (baseline/optimized): {baseline_gas}/{gas}')
+    if calls_skipped:
+        assert gas < baseline_gas
+    else:
+        assert gas <= baseline_gas
+
+    baseline_agent_eth, baseline_agent_steth, baseline_refunded_events = baseline_result
+    agent_eth, agent_steth, refunded_events = result
+    assert (agent_eth, agent_steth) == (baseline_agent_eth, baseline_agent_steth)
+
+    # the baseline emits ERC20Refunded for a zero stETH amount, the optimized version skips it
+    if wsteth_leftover > 0:
+        assert refunded_events == baseline_refunded_events
+    else:
+        assert [e['amount'] for e in baseline_refunded_events] == [0]
+        assert refunded_events == []
+
+
+def test_mint_and_close_gas_against_baseline(deployer, TestUniV3LiquidityProvider, TestUniV3LiquidityProviderBaseline,
+                                             position_manager, steth_token, lido_agent):
+    def mint_and_close(provider):
+        deployer.transfer(provider.address, ETH_TO_SEED)
+        mint_tx = provider.mint(provider.desiredTick())
+        token_id, liquidity, wsteth_provided, weth_provided = mint_tx.return_value
+        position_manager.transferFrom(LIDO_AGENT, provider, token_id, {'from': LIDO_AGENT})
+        close_tx = provider.closeLiquidityPosition()
+        return {
+            'mint_gas': mint_tx.gas_used,
+            'close_gas': close_tx.gas_used,
+            'minted': (liquidity, wsteth_provided, weth_provided),
+            'retracted': tuple(close_tx.return_value),
+            'agent_balances': (lido_agent.balance(), steth_token.balanceOf(LIDO_AGENT)),
+        }
+
+    baseline, optimized = gas_used_by_each_implementation(
+        deployer, [TestUniV3LiquidityProviderBaseline, TestUniV3LiquidityProvider], mint_and_close)
+
+    print(
+        f'gas used (baseline/optimized):\n'
+        f'  mint: {baseline["mint_gas"]}/{optimized["mint_gas"]} '
+        f'({optimized["mint_gas"] - baseline["mint_gas"]:+})\n'
+        f'  closeLiquidityPosition: {baseline["close_gas"]}/{optimized["close_gas"]} '
+        f'({optimized["close_gas"] - baseline["close_gas"]:+})'
+    )
+
+    assert optimized['mint_gas'] <= baseline['mint_gas']
+    assert optimized['close_gas'] <= baseline['close_gas']
+    assert optimized['minted'] == baseline['minted']
+    assert optimized['retracted'] == baseline['retracted']
+    assert optimized['agent_balances'] == baseline['agent_balances']
+
+
 def test_wrap_eth_to_desired_amounts_of_tokens(deployer, provider, wsteth_token, weth_token):
     deployer.transfer(provider.address, ETH_TO_SEED)
 
@@ -564,23 +930,16 @@ def test_wrap_eth_to_desired_amounts_of_tokens(deployer, provider, wsteth_token,
 
 # TODO: test_close_liquidity_position unhappy path? priced moved out of the position? priced moved a lot?
 
-def test_close_liquidity_position(deployer, provider, position_manager, steth_token, wsteth_token, weth_token, lido_agent, swapper, helpers):
-    deployer.transfer(provider.address, ETH_TO_SEED)
-
-    agent_steth_before = steth_token.balanceOf(LIDO_AGENT)
-    agent_eth_before = lido_agent.balance()
-
-    tx = provider.mint(provider.desiredTick())
-    token_id, _, wsteth_provided, weth_provided = tx.return_value
+@pytest.mark.scenario('position_owned_by_provider')
+def test_close_liquidity_position(scenario, position_manager, steth_token, wsteth_token, weth_token, lido_agent, swapper, helpers):
+    provider, token_id = scenario.provider, scenario.token_id
+    agent_steth_before, agent_eth_before = scenario.agent_steth_before, scenario.agent_eth_before
     print(
         f'liquidity provided:\n'
-        f'  wsteth={formatE18(wsteth_provided)}\n'
-        f'  weth={formatE18(weth_provided)}\n'
+        f'  wsteth={formatE18(scenario.wsteth_provided)}\n'
+        f'  weth={formatE18(scenario.weth_provided)}\n'
     )
 
-    assert position_manager.ownerOf(token_id) == LIDO_AGENT
-
-    position_manager.transferFrom(LIDO_AGENT, provider, token_id, {'from': LIDO_AGENT})
     assert position_manager.ownerOf(token_id) == provider
 
     # swap a bit to have non-zero fees
@@ -589,6 +948,7 @@ def test_close_liquidity_position(deployer, provider, position_manager, steth_to
 
     tx = provider.closeLiquidityPosition()
     wsteth_returned, weth_returned, wsteth_fees, weth_fees = tx.return_value
+    print(f'closeLiquidityPosition gas used: {tx.gas_used}')
 
     helpers.assert_single_event_named('LiquidityRetracted', tx, evt_keys_dict={
         'wstethAmount': wsteth_returned,
@@ -628,3 +988,300 @@ def test_close_liquidity_position(deployer, provider, position_manager, steth_to
 
     with reverts('ERC721: owner query for nonexistent token'):
         position_manager.ownerOf(token_id)
+
+
+def test_lens_returns_provider_state(deployer, provider, pool, position_manager, UniV3LiquidityProviderLens):
+    lens = UniV3LiquidityProviderLens.deploy({'from': deployer})
+
+    state = read_provider_state(provider, lens)
+    assert state.admin == provider.admin()
+    assert state.eth_amount == provider.ethAmount()
+    assert state.eth_balance == provider.balance()
+    assert state.desired_tick == provider.desiredTick()
+    assert state.max_tick_deviation == provider.MAX_TICK_DEVIATION()
+    assert state.desired_wsteth_amount == provider.desiredWstethAmount()
+    assert state.min_weth_amount == provider.minWethAmount()
+    assert state.liquidity_position_token_id == 0
+    assert state.position_liquidity == 0
+    assert (state.sqrt_price_x96, state.tick) == pool.slot0()[:2]
+    assert state.pool_liquidity == pool.liquidity()
+    assert state.fee_growth_global0_x128 == pool.feeGrowthGlobal0X128()
+    assert read_provider_state_deployless(provider) == state
+
+    deployer.transfer(provider.address, ETH_TO_SEED)
+    token_id, liquidity, _, _ = provider.mint(provider.desiredTick()).return_value
+
+    state = read_provider_state(provider, lens)
+    assert read_provider_state_deployless(provider) == state
+    assert state.liquidity_provided == liquidity
+    assert state.liquidity_position_token_id == token_id
+    assert state.position_liquidity == liquidity
+    assert state.position_fee_growth_inside0_last_x128 == position_manager.positions(token_id)[8]
+    assert state.upper_tick_fee_growth_outside1_x128 == pool.ticks(provider.POSITION_UPPER_TICK())[3]
+
+
+def test_read_provider_state_without_deployed_lens(deployer, provider, pool):
+    assert get_lens() is None
+    deployer_nonce = deployer.nonce
+
+    state = read_provider_state(provider)
+    assert deployer.nonce == deployer_nonce
+    assert state.admin == provider.admin() == deployer
+    assert state.desired_tick == provider.desiredTick()
+    assert state.position_lower_tick == provider.POSITION_LOWER_TICK()
+    assert (state.sqrt_price_x96, state.tick) == pool.slot0()[:2]
+    assert state.liquidity_position_token_id == 0
+
+
+@pytest.mark.scenario('position_owned_by_provider')
+def test_close_liquidity_position_preview(scenario, deployer, swapper, UniV3LiquidityProviderLens):
+    provider = scenario.provider
+    lens = UniV3LiquidityProviderLens.deploy({'from': deployer})
+
+    # swap both ways to accrue fees in both tokens
+    swapper.swapWeth({'from': deployer, 'value': toE18(10)})
+    swapper.swapWsteth({'from': deployer, 'value': toE18(10)})
+
+    preview = preview_close(provider, lens)
+    assert preview.amount0_fees > 0
+    assert preview.amount1_fees > 0
+
+    tx = provider.closeLiquidityPosition()
+    assert tuple(tx.return_value) == tuple(preview)
+
+
+def test_ratio_table_matches_contract(provider, wsteth_token, tmp_path):
+    table_path = str(tmp_path / 'ratio-table.json')
+    table = RatioTable(table_path)
+    table.refresh_rate(wsteth_token)
+
+    eth_to_use = provider.ethAmount() - provider.ETH_AMOUNT_MARGIN()
+    assert table.desired_and_min_token_amounts(provider.desiredTick(), provider.MAX_TICK_DEVIATION(), eth_to_use) \
+        == (provider.desiredWstethAmount(), provider.desiredWethAmount(),
+            provider.minWstethAmount(), provider.minWethAmount())
+
+    ticks = list(range(provider.POSITION_LOWER_TICK() + 1, provider.POSITION_UPPER_TICK(), 13))
+    amounts0, amounts1 = provider.calcDesiredTokenAmountsBatch(ticks, [eth_to_use] * len(ticks))
+    assert [table.desired_token_amounts(tick, eth_to_use) for tick in ticks] == list(zip(amounts0, amounts1))
+
+    # the persisted table is loaded instead of being recomputed
+    loaded = RatioTable(table_path)
+    assert loaded.ratios == table.ratios
+
+    with pytest.raises(ValueError):
+        table.ratio(provider.POSITION_UPPER_TICK())
+
+
+def test_pool_registry(provider, pool, wsteth_token):
+    registered_pools = discover_pools()
+    assert POOL in [registered_pool.address for registered_pool in registered_pools]
+
+    snapshots = read_pool_snapshots(registered_pools)
+    assert len({snapshot.block_number for snapshot in snapshots}) == 1
+    registered_pool, snapshot = next(
+        (registered_pool, snapshot) for registered_pool, snapshot in zip(registered_pools, snapshots)
+        if registered_pool.address == POOL
+    )
+    assert (snapshot.sqrt_price_x96, snapshot.tick) == pool.slot0()[:2]
+    assert snapshot.liquidity == pool.liquidity()
+    assert (registered_pool.position_lower_tick, registered_pool.position_upper_tick) \
+        == (provider.POSITION_LOWER_TICK(), provider.POSITION_UPPER_TICK())
+
+    eth_to_use = provider.ethAmount() - provider.ETH_AMOUNT_MARGIN()
+    steth_by_dummy_wsteth = wsteth_token.getStETHByWstETH(univ3_math.WSTETH_DUMMY_AMOUNT)
+    assert size_position(registered_pool, provider.desiredTick(), eth_to_use, steth_by_dummy_wsteth) \
+        == (provider.desiredWstethAmount(), provider.desiredWethAmount(),
+            provider.minWstethAmount(), provider.minWethAmount())
+
+
+def test_fast_calls_match_brownie_calls(provider, pool, wsteth_token, weth_token):
+    tick = pool.slot0()[1]
+    initialized_tick = get_initialized_ticks(pool, tick - 5000, tick)[0]
+    block = chain.height
+
+    assert fast_call.slot0(pool) == tuple(pool.slot0())
+    assert fast_call.ticks(pool, initialized_tick, block) == tuple(pool.ticks(initialized_tick))
+    assert fast_call.balance_of(weth_token, pool, block) == weth_token.balanceOf(pool)
+    assert fast_call.st_eth_per_token(wsteth_token) == wsteth_token.stEthPerToken()
+    assert fast_call.desired_tick(provider) == provider.desiredTick()
+    assert fast_call.get_spot_price(provider) == provider.getSpotPrice()
+
+
+def test_mint_trigger_does_not_fire_when_mint_would_fail_slippage_check(deployer, provider, set_pool_tick):
+    trigger_admin = accounts.add()
+    deployer.transfer(trigger_admin, toE18(1))
+    provider.setAdmin(trigger_admin, {'from': deployer})
+    deployer.transfer(provider.address, ETH_TO_SEED)
+
+    # in the deviation band, but out of the range where the mint min amounts are met
+    desired_tick = provider.desiredTick()
+    set_pool_tick(desired_tick + provider.MAX_TICK_DEVIATION())
+    chain.mine()
+
+    trigger = MintTrigger(provider, trigger_admin, desired_tick).arm()
+    assert trigger.conditions_hold(desired_tick + provider.MAX_TICK_DEVIATION())
+    nonce = trigger_admin.nonce
+
+    report = trigger.run(max_blocks=1)
+    assert report.submitted_at is None
+    assert report.simulations_failed == 1
+    assert trigger_admin.nonce == nonce
+    assert provider.liquidityPositionTokenId() == 0
+
+
+def test_mint_trigger_fires_when_tick_enters_the_band(deployer, provider, pool, position_manager, set_pool_tick):
+    trigger_admin = accounts.add()
+    deployer.transfer(trigger_admin, toE18(1))
+    provider.setAdmin(trigger_admin, {'from': deployer})
+    deployer.transfer(provider.address, ETH_TO_SEED)
+
+    desired_tick = provider.desiredTick()
+    set_pool_tick(desired_tick + provider.MAX_TICK_DEVIATION() + 1)
+    chain.mine()
+
+    trigger = MintTrigger(provider, trigger_admin, desired_tick).arm()
+    report = trigger.run(max_blocks=1)
+    assert report.receipt is None
+    assert report.blocks_checked == 1
+
+    set_pool_tick(desired_tick)
+    chain.mine()
+
+    report = trigger.run(max_blocks=1)
+    print(report)
+    assert report.succeeded
+    assert report.detected_tick == desired_tick
+    assert report.receipt['blockNumber'] == report.detected_block + 1
+    assert_liquidity_provided(provider, pool, position_manager, provider.liquidityPositionTokenId())
+
+
+@pytest.mark.scenario('position_owned_by_provider')
+def test_close_liquidity_position_with_quoted_min_amounts(scenario, deployer, pool, helpers):
+    provider = scenario.provider
+    quote = quote_close(provider, pool, CLOSE_TICK_TOLERANCE)
+    assert 0 < quote.amount0_min < quote.amount0
+    assert 0 < quote.amount1_min < quote.amount1
+
+    tx = provider.closeLiquidityPositionWithMinAmounts(quote.amount0_min, quote.amount1_min)
+    wsteth_returned, weth_returned, _, _ = tx.return_value
+    assert (wsteth_returned, weth_returned) == (quote.amount0, quote.amount1)
+    helpers.assert_single_event_named('LiquidityRetracted', tx)
+
+
+@pytest.mark.scenario('position_owned_by_provider')
+def test_close_liquidity_position_with_min_amounts_tick_tolerance(scenario, deployer, pool, set_pool_tick):
+    provider = scenario.provider
+    tick = pool.slot0()[1]
+    quote = quote_close(provider, pool, CLOSE_TICK_TOLERANCE)
+
+    set_pool_tick(tick + CLOSE_TICK_TOLERANCE + 1)
+    with reverts('Price slippage check'):
+        provider.closeLiquidityPositionWithMinAmounts(quote.amount0_min, quote.amount1_min)
+
+    set_pool_tick(tick - CLOSE_TICK_TOLERANCE - 1)
+    with reverts('Price slippage check'):
+        provider.closeLiquidityPositionWithMinAmounts(quote.amount0_min, quote.amount1_min)
+
+    set_pool_tick(tick - CLOSE_TICK_TOLERANCE)
+    provider.closeLiquidityPositionWithMinAmounts(quote.amount0_min, quote.amount1_min)
+
+
+@pytest.mark.scenario('position_owned_by_provider')
+def test_close_quote_swap_amount_to_band_edge_is_exact(scenario, deployer, pool, swapper):
+    tick = pool.slot0()[1]
+    quote = quote_close(scenario.provider, pool, CLOSE_TICK_TOLERANCE)
+
+    swapper.swapWeth({'from': deployer, 'value': quote.amount1_in_to_max_price})
+    upper_edge = get_band_sqrt_prices(tick, CLOSE_TICK_TOLERANCE)[1]
+    assert upper_edge == univ3_math.get_sqrt_ratio_at_tick(tick + CLOSE_TICK_TOLERANCE)
+    assert pool.slot0()[:2] == (upper_edge, tick + CLOSE_TICK_TOLERANCE)
+
+
+def test_pool_history_store_range_queries(tmp_path):
+    rows = [
+        (block, 1600000000 + 13 * block, block - 20, 2**96 + block, 2**100 * block, 2**200 + block, 2**255 + block, 10**18 + block)
+        for block in range(10, 40, 3)
+    ]
+    store = PoolHistoryStore(str(tmp_path))
+    store.append(rows[:4])
+    store.append(rows[4:])
+    with pytest.raises(ValueError):
+        store.append(rows[-1:])
+
+    store = PoolHistoryStore(str(tmp_path))
+    assert (len(store), store.last_block) == (len(rows), rows[-1][0])
+
+    columns = store.range(15, 25)
+    assert list(columns['block']) == [16, 19, 22, 25]
+    assert list(columns['tick']) == [-4, -1, 2, 5]
+    assert limbs_to_ints(columns['fee_growth_global1_x128']) == [2**255 + block for block in (16, 19, 22, 25)]
+    assert store.index_at(15) == 1
+    assert store.index_at(9) is None
+
+
+def test_pool_history_ingest_is_incremental(deployer, pool, wsteth_token, swapper, tmp_path):
+    store = PoolHistoryStore(str(tmp_path))
+    first_block = chain.height
+    swapper.swapWeth({'from': deployer, 'value': toE18(10)})
+    assert ingest(store, pool, wsteth_token, from_block=first_block) == 2
+
+    swapper.swapWsteth({'from': deployer, 'value': toE18(10)})
+    chain.mine()
+    assert ingest(store, pool, wsteth_token) == 2
+    assert list(store.column('block')) == list(range(first_block, chain.height + 1))
+
+    for index, block in enumerate(store.column('block')):
+        block = int(block)
+        sqrt_price_x96, tick = pool.slot0(block_identifier=block)[:2]
+        assert store.column('tick')[index] == tick
+        assert limbs_to_ints(store.column('sqrt_price_x96')[index:index + 1]) == [sqrt_price_x96]
+        assert limbs_to_ints(store.column('fee_growth_global1_x128')[index:index + 1]) \
+            == [pool.feeGrowthGlobal1X128(block_identifier=block)]
+        assert limbs_to_ints(store.column('st_eth_per_token')[index:index + 1]) \
+            == [wsteth_token.stEthPerToken(block_identifier=block)]
+
+
+def test_rpc_cassette_replays_recorded_responses(tmp_path):
+    upstream_calls = []
+
+    class FakeUpstream(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            upstream_calls.append(request['method'])
+            if request['method'] == 'eth_chainId':
+                response = {'jsonrpc': '2.0', 'id': request['id'], 'result': '0x1'}
+            else:
+                response = {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': 'header not found'}}
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    def post(url, method):
+        body = json.dumps({'jsonrpc': '2.0', 'id': 7, 'method': method, 'params': []}).encode()
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as resp:
+            return json.loads(resp.read())
+
+    upstream = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    cassette_path = str(tmp_path / 'cassette.json.gz')
+
+    proxy = CassetteProxy(cassette_path, RECORD, f'http://127.0.0.1:{upstream.server_address[1]}', port=0).start()
+    assert post(proxy.url, 'eth_chainId') == {'jsonrpc': '2.0', 'id': 7, 'result': '0x1'}
+    assert 'error' in post(proxy.url, 'eth_getBlockByNumber')
+    proxy.stop()
+    upstream.shutdown()
+    upstream.server_close()
+    assert (proxy.stats.recorded, proxy.stats.failed) == (1, 1)
+
+    proxy = CassetteProxy(cassette_path, REPLAY, port=0).start()
+    assert post(proxy.url, 'eth_chainId') == {'jsonrpc': '2.0', 'id': 7, 'result': '0x1'}
+    assert 'not in the cassette' in post(proxy.url, 'eth_getBlockByNumber')['error']['message']
+    proxy.stop()
+    assert (proxy.stats.replayed, proxy.stats.missed) == (1, 1)
+    assert upstream_calls == ['eth_chainId', 'eth_getBlockByNumber']